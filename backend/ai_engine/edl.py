@@ -0,0 +1,61 @@
+"""Canonical Edit Decision List (EDL) for render result caching"""
+import json
+import hashlib
+from typing import Dict, List, Tuple
+from app.config import settings
+
+# Bump whenever the renderer's output for the same EDL changes
+RENDERER_VERSION = 4
+
+
+def render_profile() -> Dict:
+    """Output encoding parameters that affect the rendered bytes"""
+    return {
+        "width": settings.RENDER_WIDTH,
+        "height": settings.RENDER_HEIGHT,
+        "fps": settings.RENDER_FPS,
+        "video_codec": settings.VIDEO_CODEC,
+        "preset": settings.VIDEO_PRESET,
+        "audio_codec": settings.AUDIO_CODEC,
+    }
+
+
+def build_edl(
+    clips: List[Tuple[int, float, float]],
+    parsed_prompt: Dict,
+    asset_hashes: Dict[int, str]
+) -> Dict:
+    """
+    Describe a render completely and independently of project and job.
+
+    Segments reference asset content hashes rather than asset IDs or storage
+    keys, so identical footage uploaded twice still yields the same EDL.
+
+    Args:
+        clips: Selected (asset_id, start_sec, end_sec) tuples in timeline order
+        parsed_prompt: Validated parser output
+        asset_hashes: Content hash of each asset, by asset ID
+
+    Returns:
+        EDL dict
+    """
+    return {
+        "renderer": RENDERER_VERSION,
+        "segments": [
+            {"asset": asset_hashes[asset_id], "start": round(start, 3), "end": round(end, 3)}
+            for asset_id, start, end in clips
+        ],
+        "filter": parsed_prompt.get('filter', 'none'),
+        "speed": parsed_prompt.get('speed', 'normal'),
+        "transition": parsed_prompt.get('transition', 'none'),
+        "overlays": parsed_prompt.get('text_overlays') or [],
+        "music": parsed_prompt.get('music_mood', 'none'),
+        "duration": parsed_prompt.get('duration'),
+        "profile": render_profile(),
+    }
+
+
+def edl_hash(edl: Dict) -> str:
+    """Hash the canonical JSON form of an EDL"""
+    canonical = json.dumps(edl, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
@@ -0,0 +1,179 @@
+"""Still-image segments encoded once and cached on disk"""
+import os
+import time
+import hashlib
+import logging
+import subprocess
+import uuid
+import cv2
+from moviepy.config import get_setting
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segments used this recently may still be read by a running render
+IN_USE_SECONDS = 3600
+
+
+def output_profile() -> str:
+    """Describe the output codec parameters a cached segment must match"""
+    return (
+        f"{settings.RENDER_WIDTH}x{settings.RENDER_HEIGHT}"
+        f"@{settings.RENDER_FPS}:{settings.VIDEO_CODEC}:{settings.VIDEO_PRESET}"
+    )
+
+
+def file_digest(file_path: str) -> str:
+    """Compute the SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_image_segment(image_path: str, duration: float) -> str:
+    """
+    Get a constant-frame video segment for a still image.
+
+    The image is decoded and fitted to the output size once, then encoded as a
+    short static clip at the output codec parameters. Segments are cached by
+    image hash, duration and output profile, so repeated renders reuse them.
+
+    Args:
+        image_path: Path to the image file
+        duration: Segment length in seconds
+
+    Returns:
+        Path to the cached segment
+    """
+    key = hashlib.sha256(
+        f"{file_digest(image_path)}|{duration:.3f}|{output_profile()}".encode()
+    ).hexdigest()
+    segment_path = os.path.join(settings.SEGMENT_CACHE_DIR, f"image_{key}.mp4")
+
+    if os.path.exists(segment_path):
+        logger.info(f"Image segment cache hit for {image_path}")
+        touch_segment(segment_path)
+        return segment_path
+
+    os.makedirs(settings.SEGMENT_CACHE_DIR, exist_ok=True)
+    tmp_id = uuid.uuid4().hex
+    frame_path = os.path.join(settings.SEGMENT_CACHE_DIR, f"frame_{tmp_id}.png")
+    tmp_segment = os.path.join(settings.SEGMENT_CACHE_DIR, f"image_{tmp_id}.mp4")
+
+    try:
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        cv2.imwrite(frame_path, _fit_to_frame(image, settings.RENDER_WIDTH, settings.RENDER_HEIGHT))
+
+        subprocess.run(
+            [
+                get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+                '-loop', '1', '-framerate', str(settings.RENDER_FPS), '-i', frame_path,
+                '-t', f"{duration:.3f}",
+                '-c:v', settings.VIDEO_CODEC, '-preset', settings.VIDEO_PRESET,
+                '-tune', 'stillimage', '-pix_fmt', 'yuv420p',
+                '-r', str(settings.RENDER_FPS),
+                tmp_segment
+            ],
+            check=True,
+            capture_output=True
+        )
+
+        # Atomic publish so concurrent renders never see a partial file
+        os.replace(tmp_segment, segment_path)
+        logger.info(f"Encoded image segment for {image_path} ({duration:.1f}s)")
+        return segment_path
+
+    finally:
+        for path in (frame_path, tmp_segment):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def touch_segment(segment_path: str):
+    """Mark a cached segment as used, so eviction keeps it"""
+    try:
+        os.utime(segment_path)
+    except OSError:
+        pass
+
+
+def evict_segment_cache(root: str = None) -> int:
+    """
+    Bound the segment cache in size and age.
+
+    Covers the image segments and the per-project timeline segments below
+    SEGMENT_CACHE_DIR. Segments unused for SEGMENT_CACHE_MAX_AGE_HOURS go
+    first, then the least recently used until the cache fits in
+    SEGMENT_CACHE_MAX_BYTES. Segments used within the last IN_USE_SECONDS
+    may belong to a running render and are always kept.
+
+    Returns:
+        Number of bytes freed
+    """
+    root = root or settings.SEGMENT_CACHE_DIR
+    if not os.path.isdir(root):
+        return 0
+
+    now = time.time()
+    protected_after = now - IN_USE_SECONDS
+    expired_before = now - settings.SEGMENT_CACHE_MAX_AGE_HOURS * 3600
+
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            # Partial files belong to encodes still in progress
+            if not name.endswith(".mp4") or name.endswith(".part.mp4"):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for mtime, size, path in entries:
+        if mtime >= protected_after:
+            break
+        if mtime >= expired_before and total - freed <= settings.SEGMENT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError as e:
+            logger.warning(f"Failed to evict segment {path}: {str(e)}")
+
+    # Project directories left without segments
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith("project_") and os.path.isdir(path) and not os.listdir(path):
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    if freed:
+        logger.info(f"Evicted {freed} bytes from the segment cache")
+    return freed
+
+
+def _fit_to_frame(image, width: int, height: int):
+    """Resize an image to fit the output frame, letterboxing the remainder"""
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h)
+    new_w = max(int(w * scale) // 2 * 2, 2)
+    new_h = max(int(h * scale) // 2 * 2, 2)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    top = (height - new_h) // 2
+    left = (width - new_w) // 2
+    return cv2.copyMakeBorder(
+        resized, top, height - new_h - top, left, width - new_w - left,
+        cv2.BORDER_CONSTANT, value=(0, 0, 0)
+    )
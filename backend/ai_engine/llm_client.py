@@ -0,0 +1,204 @@
+"""Pooled, circuit-broken Ollama client"""
+import json
+import time
+import logging
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """Raised when the LLM cannot produce a result; callers fall back"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while.
+
+    After ``threshold`` consecutive failures the breaker opens and calls are
+    refused for ``cooldown`` seconds. Then a single trial call is let through:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"LLM circuit opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class _JSONObjectScanner:
+    """Find the end of the first complete JSON object in streamed text"""
+
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Append a chunk of text.
+
+        Returns:
+            The first balanced ``{...}`` object once it is complete, else None
+        """
+        offset = len(self.text)
+        self.text += chunk
+        for i in range(offset, len(self.text)):
+            char = self.text[i]
+            if self.start is None:
+                if char == "{":
+                    self.start, self._depth = i, 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text[self.start:i + 1]
+        return None
+
+
+class OllamaClient:
+    """
+    Client for Ollama's generate API.
+
+    Connections are pooled across calls, output is constrained to a JSON
+    schema, and the response is streamed so reading stops as soon as the
+    object is complete (the model often keeps generating after it).
+    """
+
+    def __init__(self, base_url: str = None, model: str = None):
+        self.base_url = (base_url if base_url is not None else settings.OLLAMA_BASE_URL).rstrip("/")
+        self.model = model or settings.OLLAMA_MODEL
+        self.breaker = CircuitBreaker(settings.OLLAMA_BREAKER_FAILURES, settings.OLLAMA_BREAKER_COOLDOWN_SECONDS)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OLLAMA_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate_json(self, prompt: str, schema: Dict) -> Dict:
+        """
+        Generate a JSON object matching a schema.
+
+        Args:
+            prompt: Full prompt text
+            schema: JSON schema passed as Ollama's ``format``
+
+        Returns:
+            The decoded object
+
+        Raises:
+            LLMUnavailable: Ollama is not configured, the circuit is open, or the call failed
+        """
+        if not self.base_url:
+            raise LLMUnavailable("Ollama is not configured")
+        if not self.breaker.allow():
+            raise LLMUnavailable("Ollama circuit is open")
+
+        try:
+            result = self._stream_object(prompt, schema)
+        except Exception as e:
+            self.breaker.record_failure()
+            raise LLMUnavailable(str(e)) from e
+
+        self.breaker.record_success()
+        return result
+
+    def _stream_object(self, prompt: str, schema: Dict) -> Dict:
+        deadline = time.monotonic() + settings.OLLAMA_TIMEOUT_SECONDS
+        scanner = _JSONObjectScanner()
+
+        with self.session.post(
+            f"{self.base_url}/api/generate",
+            json={
+                "model": self.model,
+                "prompt": prompt,
+                "stream": True,
+                "format": schema,
+                "options": {"temperature": 0.7}
+            },
+            stream=True,
+            timeout=(settings.OLLAMA_CONNECT_TIMEOUT_SECONDS, settings.OLLAMA_TIMEOUT_SECONDS)
+        ) as response:
+            response.raise_for_status()
+
+            # One JSON message per line, each carrying the next tokens
+            lines = response.iter_lines()
+            for line in lines:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No complete object after {settings.OLLAMA_TIMEOUT_SECONDS}s")
+                if not line:
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    raise RuntimeError(message["error"])
+
+                found = scanner.feed(message.get("response", ""))
+                if found:
+                    if message.get("done"):
+                        # Only the end of the body follows; reading it returns
+                        # the connection to the pool
+                        for _ in lines:
+                            pass
+                    # Otherwise leaving the block closes the connection mid-generation
+                    return json.loads(found)
+                if message.get("done"):
+                    break
+
+        raise ValueError("Response ended without a complete JSON object")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> OllamaClient:
+    """Get the process-wide Ollama client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
@@ -1,9 +1,11 @@
 """Object tagging using YOLOv8"""
 import logging
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 import cv2
+import numpy as np
 from ultralytics import YOLO
+from celery.exceptions import SoftTimeLimitExceeded
 
 logger = logging.getLogger(__name__)
 
@@ -20,49 +22,99 @@ def get_yolo_model():
     return _yolo_model
 
 
-def tag_video(video_path: str, sample_rate: int = 30) -> List[str]:
+class FrameTagger:
+    """
+    Collect the object tags of a sequence of video frames, sampling every nth.
+
+    Called with each decoded frame, by tag_video or by scene detection
+    (see detect_scenes ``on_frame``) so a video is decoded only once.
+    """
+
+    def __init__(self, sample_rate: int = 30, progress: Optional[Callable[[float], None]] = None):
+        """
+        Args:
+            sample_rate: Sample every nth frame
+            progress: Called with the fraction of frames analyzed
+        """
+        self.sample_rate = sample_rate
+        self.progress = progress
+        self.tags = set()
+        self._model = get_yolo_model()
+        self._frame_count = 0
+
+    def __call__(self, frame: np.ndarray, position: Optional[float] = None):
+        """
+        Args:
+            frame: Decoded BGR frame
+            position: Fraction of the video read so far, if known
+        """
+        if self._frame_count % self.sample_rate == 0:
+            for result in self._model(frame):
+                if hasattr(result, 'names'):
+                    for class_id in result.boxes.cls:
+                        self.tags.add(result.names[int(class_id)])
+
+            if self.progress and position is not None:
+                self.progress(min(position, 1.0))
+
+        self._frame_count += 1
+
+
+def tag_video(
+    video_path: str,
+    sample_rate: int = 30,
+    progress: Optional[Callable[[float], None]] = None
+) -> List[str]:
     """
     Tag objects detected in a video by sampling frames.
 
     Args:
-        video_path: Path to the video file
+        video_path: Path or URL of the video (URLs are read as a stream)
         sample_rate: Sample every nth frame
+        progress: Called with the fraction of frames analyzed
 
     Returns:
         List of detected object tags
+
+    Raises:
+        Exception: The video could not be read or tagged
     """
+    # Presigned URLs carry credentials in their query string
+    source_name = video_path.split('?')[0]
+    cap = None
     try:
-        model = get_yolo_model()
-        detected_tags = set()
+        tagger = FrameTagger(sample_rate, progress)
 
         cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {source_name}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
         frame_count = 0
 
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
-
-            # Sample every nth frame
-            if frame_count % sample_rate == 0:
-                results = model(frame)
-                for result in results:
-                    if hasattr(result, 'names'):
-                        for class_id in result.boxes.cls:
-                            tag = result.names[int(class_id)]
-                            detected_tags.add(tag)
-
+            tagger(frame, frame_count / total_frames if total_frames else None)
             frame_count += 1
 
-        cap.release()
-
-        tags = list(detected_tags)
+        tags = list(tagger.tags)
         logger.info(f"Detected {len(tags)} object types in video: {tags}")
         return tags
 
+    except SoftTimeLimitExceeded:
+        # Let the worker checkpoint and resume instead of recording a failure
+        raise
     except Exception as e:
-        logger.error(f"Failed to tag video: {str(e)}")
-        return []
+        message = str(e).replace(video_path, source_name)
+        logger.error(f"Failed to tag video {source_name}: {message}")
+        if message != str(e):
+            raise RuntimeError(f"Failed to tag video {source_name}: {message}") from None
+        raise
+
+    finally:
+        if cap is not None:
+            cap.release()
 
 
 def tag_image(image_path: str) -> List[str]:
@@ -74,6 +126,9 @@ def tag_image(image_path: str) -> List[str]:
 
     Returns:
         List of detected object tags
+
+    Raises:
+        Exception: The image could not be read or tagged
     """
     try:
         model = get_yolo_model()
@@ -96,4 +151,4 @@ def tag_image(image_path: str) -> List[str]:
 
     except Exception as e:
         logger.error(f"Failed to tag image: {str(e)}")
-        return []
+        raise
@@ -0,0 +1,161 @@
+"""Two-level cache of parsed prompts (in-process LRU in front of Redis)"""
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "prompt_cache:{digest}"
+STATS_KEY = "prompt_cache:stats"  # hash: lru_hits / redis_hits / misses across all processes
+COUNTERS = ("lru_hits", "redis_hits", "misses")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Canonical form of a prompt for cache lookups.
+
+    Unicode is NFKC-normalized and whitespace collapsed. Case is kept, since
+    the model copies text overlays verbatim from the prompt.
+    """
+    return " ".join(unicodedata.normalize("NFKC", prompt or "").split())
+
+
+class PromptCache:
+    """
+    Cache of parsed prompts keyed by normalized prompt, model and parser version.
+
+    Lookups hit a small per-process LRU first, then Redis (shared by all
+    workers, expiring after ``ttl`` seconds). Redis errors degrade to a miss.
+
+    Hits and misses are counted in process and added to the shared counters
+    at most every ``PROMPT_CACHE_STATS_FLUSH_SECONDS``, in one round trip.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        self.max_entries = max_entries if max_entries is not None else settings.PROMPT_CACHE_LRU_SIZE
+        self.ttl = ttl or settings.PROMPT_CACHE_TTL_SECONDS
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._unflushed = dict.fromkeys(COUNTERS, 0)
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def key(prompt: str, model: str, version: str) -> str:
+        digest = hashlib.sha256(f"{model}\0{version}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+        return CACHE_KEY.format(digest=digest)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a parsed prompt.
+
+        Returns:
+            A fresh copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is not None:
+            self._count("lru_hits")
+            return json.loads(value)
+
+        try:
+            value = get_redis().get(key)
+        except Exception as e:
+            logger.warning(f"Prompt cache unavailable: {str(e)}")
+            value = None
+
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._remember(key, value)
+        self._count("redis_hits")
+        return json.loads(value)
+
+    def set(self, key: str, parsed: Dict):
+        """Store a parsed prompt in both levels"""
+        value = json.dumps(parsed, sort_keys=True)
+        self._remember(key, value)
+        try:
+            get_redis().set(key, value, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to store parsed prompt: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Hit and miss counters of this process and of all processes"""
+        self.flush()
+        try:
+            shared = {k: int(v) for k, v in get_redis().hgetall(STATS_KEY).items()}
+        except Exception as e:
+            logger.warning(f"Failed to read prompt cache stats: {str(e)}")
+            shared = {}
+
+        with self._lock:
+            local = dict(self.counters, entries=len(self._entries))
+        lookups = sum(shared.get(k, 0) for k in COUNTERS)
+        hits = shared.get("lru_hits", 0) + shared.get("redis_hits", 0)
+        return {
+            "process": local,
+            "total": shared,
+            "hit_rate": round(hits / lookups, 3) if lookups else None
+        }
+
+    def _remember(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def flush(self):
+        """Add the counts since the last flush to the shared counters"""
+        with self._lock:
+            pending = {k: v for k, v in self._unflushed.items() if v}
+            self._unflushed = dict.fromkeys(COUNTERS, 0)
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for counter, count in pending.items():
+                pipe.hincrby(STATS_KEY, counter, count)
+            pipe.execute()
+        except Exception as e:
+            # Statistics only; the counts are dropped rather than retried
+            logger.warning(f"Failed to flush prompt cache stats: {str(e)}")
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+            self._unflushed[counter] += 1
+            due = time.monotonic() - self._last_flush >= settings.PROMPT_CACHE_STATS_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+
+_prompt_cache = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Get the process-wide prompt cache"""
+    global _prompt_cache
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = PromptCache()
+                # Counts since the last flush would be lost otherwise
+                atexit.register(_prompt_cache.flush)
+    return _prompt_cache
@@ -1,13 +1,47 @@
 """Prompt parsing using LLM (Ollama with Llama 3)"""
-import json
 import logging
 import re
 from typing import Dict, Optional, List
-import requests
 from app.config import settings
+from ai_engine.llm_client import LLMUnavailable, get_llm_client
+from ai_engine.prompt_cache import get_prompt_cache
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the system prompt or the validation changes, so cached
+# parses made by the old parser are no longer used
+PARSER_VERSION = "2"
+
+# Output format the model is constrained to
+PARSED_PROMPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "duration": {"type": ["integer", "null"]},
+        "filter": {"enum": ["vintage", "b&w", "sepia", "none"]},
+        "speed": {"enum": ["slow", "normal", "fast"]},
+        "music_mood": {"enum": ["upbeat", "calm", "cinematic", "none"]},
+        "include_tags": {"type": "array", "items": {"type": "string"}},
+        "exclude_tags": {"type": "array", "items": {"type": "string"}},
+        "transition": {"enum": ["fade", "dissolve", "glitch", "none"]},
+        "pacing": {"enum": ["fast", "medium", "slow"]},
+        "text_overlays": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string"},
+                    "position": {"enum": ["top", "center", "bottom"]}
+                },
+                "required": ["text", "position"]
+            }
+        }
+    },
+    "required": [
+        "duration", "filter", "speed", "music_mood", "include_tags",
+        "exclude_tags", "transition", "pacing", "text_overlays"
+    ]
+}
+
 
 def parse_prompt_with_ollama(prompt: str) -> Dict:
     """
@@ -19,6 +53,32 @@ def parse_prompt_with_ollama(prompt: str) -> Dict:
     Returns:
         Structured JSON with editing parameters
     """
+    parsed = parse_prompt_with_llm(prompt)
+    if parsed is not None:
+        return parsed
+
+    # Fallback to rule-based parsing; not cached, so the LLM is retried next time
+    return parse_prompt_rule_based(prompt)
+
+
+def parse_prompt_with_llm(prompt: str) -> Optional[Dict]:
+    """
+    Parse a natural language prompt with the LLM only.
+
+    Args:
+        prompt: User's natural language prompt
+
+    Returns:
+        Structured JSON with editing parameters, or None if the LLM is unavailable
+    """
+    # Repeated and template prompts skip the LLM round trip
+    cache = get_prompt_cache()
+    cache_key = cache.key(prompt, settings.OLLAMA_MODEL, PARSER_VERSION)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Prompt parse cache hit: {cached}")
+        return cached
+
     system_prompt = """You are an expert video editor AI. Parse the user's video editing request and return a JSON object with the following fields:
     - duration: Target video duration in seconds (or null for auto)
     - filter: Visual filter to apply ('vintage', 'b&w', 'sepia', 'none')
@@ -33,30 +93,85 @@ def parse_prompt_with_ollama(prompt: str) -> Dict:
     Return ONLY valid JSON, no other text."""
 
     try:
-        response = requests.post(
-            f"{settings.OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": settings.OLLAMA_MODEL,
-                "prompt": f"{system_prompt}\n\nUser request: {prompt}",
-                "stream": False,
-                "temperature": 0.7
-            },
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            response_text = response.json().get('response', '')
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
-                logger.info(f"Prompt parsed successfully: {parsed}")
-                return _validate_parsed_prompt(parsed)
-    except Exception as e:
+        parsed = get_llm_client().generate_json(f"{system_prompt}\n\nUser request: {prompt}", PARSED_PROMPT_SCHEMA)
+        logger.info(f"Prompt parsed successfully: {parsed}")
+        parsed = _validate_parsed_prompt(parsed)
+        cache.set(cache_key, parsed)
+        return parsed
+    except LLMUnavailable as e:
         logger.warning(f"Ollama parsing failed: {str(e)}")
-
-    # Fallback to rule-based parsing
-    return parse_prompt_rule_based(prompt)
+        return None
+
+
+# (attribute, value, phrases). When a prompt names several values of one
+# attribute, the earlier row wins. Pacing phrases are listed as whole
+# phrases so that "fast pacing" does not also speed the footage up.
+_KEYWORDS = [
+    ('filter', 'vintage', ['vintage', 'retro']),
+    ('filter', 'b&w', ['black and white', 'black & white', 'b&w', 'monochrome']),
+    ('filter', 'sepia', ['sepia', 'brown']),
+    ('pacing', 'fast', ['fast pacing', 'fast paced', 'fast-paced', 'quick cuts']),
+    ('pacing', 'slow', ['slow pacing', 'slow paced', 'slow-paced']),
+    ('speed', 'slow', ['slow motion', 'slow-mo', 'slow']),
+    ('speed', 'fast', ['fast', 'speed up', 'sped up', '2x']),
+    ('music_mood', 'upbeat', ['upbeat', 'energetic', 'fun']),
+    ('music_mood', 'calm', ['calm', 'relaxing', 'peaceful']),
+    ('music_mood', 'cinematic', ['cinematic', 'epic', 'dramatic']),
+    ('transition', 'fade', ['fade', 'fades']),
+    ('transition', 'dissolve', ['dissolve', 'dissolves']),
+    ('transition', 'glitch', ['glitch', 'glitches']),
+]
+
+_PHRASES = {
+    phrase: (attribute, value, rank)
+    for rank, (attribute, value, phrases) in enumerate(_KEYWORDS)
+    for phrase in phrases
+}
+
+_DURATION_UNITS = {'s': 1, 'sec': 1, 'secs': 1, 'second': 1, 'seconds': 1,
+                   'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60}
+
+# One pass over the prompt finds every duration and keyword. Longer phrases
+# come first so they win over their prefixes at the same position.
+_TOKENS = re.compile(
+    r'(?P<amount>\d+)\s*(?P<unit>' + '|'.join(sorted(_DURATION_UNITS, key=len, reverse=True)) + r')\b'
+    r'|(?<!\w)(?P<phrase>' + '|'.join(re.escape(p) for p in sorted(_PHRASES, key=len, reverse=True)) + r')(?!\w)'
+)
+
+_DEFAULTS = {
+    'filter': 'none',
+    'speed': 'normal',
+    'music_mood': 'none',
+    'transition': 'none',
+    'pacing': 'medium',
+}
+
+
+def _parse_rules(prompt: str) -> Dict:
+    duration = None
+    best = {}  # attribute -> (rank, value)
+
+    for match in _TOKENS.finditer(prompt.lower()):
+        if match.group('phrase'):
+            attribute, value, rank = _PHRASES[match.group('phrase')]
+            if attribute not in best or rank < best[attribute][0]:
+                best[attribute] = (rank, value)
+        elif duration is None:
+            duration = int(match.group('amount')) * _DURATION_UNITS[match.group('unit')]
+
+    parsed = {attribute: best[attribute][1] if attribute in best else default
+              for attribute, default in _DEFAULTS.items()}
+    return {
+        'duration': duration,
+        'filter': parsed['filter'],
+        'speed': parsed['speed'],
+        'music_mood': parsed['music_mood'],
+        'include_tags': [],
+        'exclude_tags': [],
+        'transition': parsed['transition'],
+        'pacing': parsed['pacing'],
+        'text_overlays': []
+    }
 
 
 def parse_prompt_rule_based(prompt: str) -> Dict:
@@ -69,76 +184,35 @@ def parse_prompt_rule_based(prompt: str) -> Dict:
     Returns:
         Structured JSON with editing parameters
     """
-    prompt_lower = prompt.lower()
-
-    # Duration detection
-    duration = None
-    if '30 second' in prompt_lower:
-        duration = 30
-    elif '1 minute' in prompt_lower:
-        duration = 60
-    elif '2 minute' in prompt_lower:
-        duration = 120
-    elif match := re.search(r'(\d+)\s*(?:second|sec|s)', prompt_lower):
-        duration = int(match.group(1))
-
-    # Filter detection
-    filter_type = 'none'
-    if 'vintage' in prompt_lower or 'retro' in prompt_lower:
-        filter_type = 'vintage'
-    elif 'black and white' in prompt_lower or 'b&w' in prompt_lower or 'monochrome' in prompt_lower:
-        filter_type = 'b&w'
-    elif 'sepia' in prompt_lower or 'brown' in prompt_lower:
-        filter_type = 'sepia'
-
-    # Speed detection
-    speed = 'normal'
-    if 'slow' in prompt_lower or 'slow motion' in prompt_lower:
-        speed = 'slow'
-    elif 'fast' in prompt_lower or 'speed up' in prompt_lower or '2x' in prompt_lower:
-        speed = 'fast'
-
-    # Music mood detection
-    music_mood = 'none'
-    if 'upbeat' in prompt_lower or 'energetic' in prompt_lower or 'fun' in prompt_lower:
-        music_mood = 'upbeat'
-    elif 'calm' in prompt_lower or 'relaxing' in prompt_lower or 'peaceful' in prompt_lower:
-        music_mood = 'calm'
-    elif 'cinematic' in prompt_lower or 'epic' in prompt_lower or 'dramatic' in prompt_lower:
-        music_mood = 'cinematic'
-
-    # Transition detection
-    transition = 'none'
-    if 'fade' in prompt_lower:
-        transition = 'fade'
-    elif 'dissolve' in prompt_lower:
-        transition = 'dissolve'
-    elif 'glitch' in prompt_lower:
-        transition = 'glitch'
-
-    # Pacing detection
-    pacing = 'medium'
-    if 'fast' in prompt_lower and 'pacing' in prompt_lower:
-        pacing = 'fast'
-    elif 'slow' in prompt_lower and 'pacing' in prompt_lower:
-        pacing = 'slow'
-
-    parsed = {
-        'duration': duration,
-        'filter': filter_type,
-        'speed': speed,
-        'music_mood': music_mood,
-        'include_tags': [],
-        'exclude_tags': [],
-        'transition': transition,
-        'pacing': pacing,
-        'text_overlays': []
-    }
-
+    parsed = _parse_rules(prompt)
     logger.info(f"Prompt parsed using rule-based engine: {parsed}")
     return parsed
 
 
+def parse_many(prompts: List[str]) -> List[Dict]:
+    """
+    Rule-based parsing of many prompts, e.g. live previews or template batches.
+
+    Identical prompts are parsed once; every result is a separate dict.
+
+    Args:
+        prompts: Natural language prompts
+
+    Returns:
+        Structured parameters, in the order of the prompts
+    """
+    parsed = {}
+    results = []
+    for prompt in prompts:
+        if prompt not in parsed:
+            parsed[prompt] = _parse_rules(prompt)
+        result = dict(parsed[prompt])
+        for key in ('include_tags', 'exclude_tags', 'text_overlays'):
+            result[key] = []
+        results.append(result)
+    return results
+
+
 def _validate_parsed_prompt(parsed: Dict) -> Dict:
     """Validate and normalize parsed prompt"""
     defaults = {
@@ -1,17 +1,44 @@
 """Video rendering using MoviePy and FFmpeg"""
 import os
+import math
 import logging
-from typing import List, Tuple, Optional
+import uuid
+import hashlib
+import subprocess
+from typing import Callable, List, Tuple, Optional
 import numpy as np
 from moviepy.editor import (
     VideoFileClip, ImageClip, CompositeVideoClip, CompositeAudioClip,
-    concatenate_videoclips, TextClip
+    concatenate_videoclips, TextClip, vfx
 )
+from moviepy.audio.AudioClip import AudioClip
 from moviepy.audio.AudioFileClip import AudioFileClip
+from moviepy.config import get_setting
+from proglog import ProgressBarLogger
 import cv2
+from app.config import settings
+from ai_engine.image_segments import get_image_segment, touch_segment
+from celery.exceptions import SoftTimeLimitExceeded
 
 logger = logging.getLogger(__name__)
 
+HLS_PLAYLIST_NAME = 'index.m3u8'
+
+# Bump whenever an encoded segment's frames change for the same label, so
+# segments cached by an earlier version are not reused
+SEGMENT_VERSION = "3"
+
+# One audio rate for all segments, as stream-copy concatenation requires
+SEGMENT_AUDIO_FPS = 44100
+
+# Length of the overlap window blended at each cut (seconds)
+TRANSITION_DURATION = 0.5
+TRANSITION_TYPES = ('fade', 'dissolve', 'glitch')
+
+
+class RenderCancelled(Exception):
+    """Raised from a progress check once the caller asks to stop rendering"""
+
 
 def apply_filter(clip, filter_type: str):
     """Apply visual filter to a clip"""
@@ -49,7 +76,14 @@ def render_video(
     transition_type: str = 'none',
     music_mood: str = 'none',
     text_overlays: List[dict] = None,
-    duration: Optional[int] = None
+    duration: Optional[int] = None,
+    stream_dir: Optional[str] = None,
+    segment_dir: Optional[str] = None,
+    on_segment: Optional[Callable[[str], None]] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    clip_keys: Optional[List[str]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    clip_types: Optional[List[str]] = None
 ) -> bool:
     """
     Render a video from selected clips.
@@ -63,19 +97,38 @@ def render_video(
         music_mood: Background music mood
         text_overlays: List of text overlay specifications
         duration: Target duration in seconds
+        stream_dir: If set, encode as HLS segments into this directory while
+            rendering, then remux them into output_path
+        segment_dir: If set, encode each timeline segment into this directory
+            first and reuse segments that already exist there. Unless a final
+            pass is needed (see needs_final_pass), the segments are then
+            joined into the output without re-encoding
+        on_segment: Called with the path of every finished segment
+        progress: Called with the encoded fraction (0-1) as frames are written
+        clip_keys: Content identity of each clip (e.g. asset hash and range).
+            When given, segments are named by content instead of position, so
+            a later render reuses every segment whose inputs did not change
+        cancelled: Polled with every encoded frame; returning True aborts the
+            render with RenderCancelled
+        clip_types: Asset type of each clip ('video' or 'image'); clips are
+            treated as videos when omitted
 
     Returns:
         True if successful, False otherwise
     """
+    progress = _cancellable(progress, cancelled)
     try:
         logger.info(f"Rendering video with {len(clips_info)} clips to {output_path}")
 
         # Extract clips
         clips = []
-        for file_path, start, end in clips_info:
+        keys = []
+        for i, (file_path, start, end) in enumerate(clips_info):
             try:
-                clip = VideoFileClip(file_path).subclip(start, end)
+                is_image = bool(clip_types) and clip_types[i] == 'image'
+                clip = _load_clip(file_path, start, end, is_image=is_image)
                 clips.append(clip)
+                keys.append(clip_keys[i] if clip_keys else None)
             except Exception as e:
                 logger.error(f"Failed to load clip {file_path}: {str(e)}")
                 continue
@@ -93,31 +146,54 @@ def render_video(
         if filter_type != 'none':
             clips = [apply_filter(clip, filter_type) for clip in clips]
 
-        # Concatenate with transitions
-        if transition_type == 'fade':
-            video = concatenate_videoclips(clips, method='chain')
+        # Concatenate with transitions; only the overlap windows are blended
+        timeline = _build_timeline(clips, transition_type, keys=keys if clip_keys else None)
+        if duration:
+            timeline = _fit_duration(timeline, duration)
+
+        final_pass = needs_final_pass(text_overlays, music_mood)
+        if segment_dir:
+            # Without a final pass the segments are the output
+            preset = settings.SEGMENT_PRESET if final_pass else settings.VIDEO_PRESET
+            names = None
+            if clip_keys:
+                names = [_segment_name(label, filter_type, speed_factor, preset) for _, label in timeline]
+
+            # Each finished segment goes live on the stream right away
+            playlist = None
+            if stream_dir and not final_pass:
+                playlist = _SegmentPlaylist(stream_dir, math.ceil(max(piece.duration for piece, _ in timeline)))
+
+            def segment_done(segment_path: str):
+                if on_segment:
+                    on_segment(segment_path)
+                if playlist:
+                    playlist.add(segment_path)
+
+            segment_paths = _render_segments(
+                [piece for piece, _ in timeline], segment_dir, segment_done,
+                progress=_scaled(progress, 0.0, 0.5) if final_pass else progress,
+                names=names,
+                preset=preset
+            )
+
+            if not final_pass:
+                if playlist:
+                    playlist.finish()
+                _concat_segments(segment_paths, output_path)
+                logger.info(f"Video joined from {len(segment_paths)} segments to {output_path}")
+                return True
+
+            progress = _scaled(progress, 0.5, 0.5)
+            timeline = [VideoFileClip(segment_path) for segment_path in segment_paths]
         else:
-            video = concatenate_videoclips(clips, method='chain')
+            timeline = [piece for piece, _ in timeline]
+        video = concatenate_videoclips(timeline, method='chain')
 
         # Add text overlays
         if text_overlays:
             video = _add_text_overlays(video, text_overlays)
 
-        # Handle duration adjustment
-        if duration:
-            current_duration = video.duration
-            if current_duration < duration:
-                # Loop last clip to reach target
-                loops_needed = int((duration / current_duration) + 1)
-                last_clip = VideoFileClip(clips_info[-1][0]).subclip(
-                    clips_info[-1][1], clips_info[-1][2]
-                )
-                extended_clips = list(clips) + [last_clip] * (loops_needed - 1)
-                video = concatenate_videoclips(extended_clips, method='chain')
-                video = video.subclip(0, duration)
-            elif current_duration > duration:
-                video = video.subclip(0, duration)
-
         # Add music
         if music_mood != 'none':
             music_path = _get_music_path(music_mood)
@@ -141,23 +217,460 @@ def render_video(
                     logger.warning(f"Failed to add music: {str(e)}")
 
         # Write video
-        video.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            fps=24,
-            verbose=False,
-            logger=None
-        )
+        if stream_dir:
+            _write_hls(video, stream_dir, progress)
+            _remux_hls(os.path.join(stream_dir, HLS_PLAYLIST_NAME), output_path)
+        else:
+            video.write_videofile(
+                output_path,
+                codec=settings.VIDEO_CODEC,
+                audio_codec=settings.AUDIO_CODEC,
+                preset=settings.VIDEO_PRESET,
+                fps=settings.RENDER_FPS,
+                verbose=False,
+                logger=_encode_logger(progress)
+            )
 
         logger.info(f"Video rendered successfully to {output_path}")
         return True
 
+    except (SoftTimeLimitExceeded, RenderCancelled):
+        # Let the worker checkpoint and resume (or clean up) instead of recording a failure
+        raise
     except Exception as e:
         logger.error(f"Rendering failed: {str(e)}")
         return False
 
 
+def needs_final_pass(text_overlays: Optional[List[dict]], music_mood: str) -> bool:
+    """
+    Whether a render has to re-encode the joined timeline.
+
+    Text overlays and music span segment boundaries, so they are added over
+    the whole timeline; anything else can be joined from segments as is.
+    """
+    return bool(text_overlays) or (music_mood != 'none' and _get_music_path(music_mood) is not None)
+
+
+def _render_segments(
+    timeline: list,
+    segment_dir: str,
+    on_segment: Optional[Callable[[str], None]] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    names: Optional[List[str]] = None,
+    preset: Optional[str] = None
+) -> List[str]:
+    """
+    Encode timeline pieces to individual segment files.
+
+    Segments already present in segment_dir (from an interrupted attempt, or
+    with content names from an earlier render) are reused as is. Each file is
+    published atomically, so a segment either exists completely or not at all.
+    Every segment gets an audio track, silent if need be, so all of them can
+    be joined by stream copy.
+
+    Returns:
+        Paths of the encoded segments, in timeline order
+    """
+    os.makedirs(segment_dir, exist_ok=True)
+    segment_paths = []
+    total = sum(piece.duration for piece in timeline) or 1.0
+    done = 0.0
+
+    for i, piece in enumerate(timeline):
+        name = names[i] if names else f"segment_{i:04d}"
+        segment_path = os.path.join(segment_dir, f"{name}.mp4")
+
+        if os.path.exists(segment_path):
+            logger.info(f"Reusing rendered segment {segment_path}")
+            touch_segment(segment_path)
+        else:
+            tmp_path = os.path.join(segment_dir, f"{name}.{uuid.uuid4().hex}.part.mp4")
+            if piece.audio is None:
+                piece = piece.set_audio(_silence(piece.duration))
+            try:
+                piece.write_videofile(
+                    tmp_path,
+                    codec=settings.VIDEO_CODEC,
+                    audio_codec=settings.AUDIO_CODEC,
+                    audio_fps=SEGMENT_AUDIO_FPS,
+                    preset=preset or settings.SEGMENT_PRESET,
+                    fps=settings.RENDER_FPS,
+                    verbose=False,
+                    logger=_encode_logger(_scaled(progress, done / total, piece.duration / total))
+                )
+                os.replace(tmp_path, segment_path)
+            finally:
+                # An interrupted encode must not leave a partial file behind
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        done += piece.duration
+        if progress:
+            progress(done / total)
+        if on_segment:
+            on_segment(segment_path)
+        segment_paths.append(segment_path)
+
+    return segment_paths
+
+
+def _silence(duration: float):
+    """Silent stereo track for pieces without audio"""
+    return AudioClip(
+        lambda t: np.zeros((len(t), 2)) if isinstance(t, np.ndarray) else np.zeros(2),
+        duration=duration,
+        fps=SEGMENT_AUDIO_FPS
+    )
+
+
+def _concat_segments(segment_paths: List[str], output_path: str):
+    """Join encoded segments into one MP4 by stream copy (ffmpeg concat demuxer)"""
+    list_path = f"{output_path}.{uuid.uuid4().hex}.txt"
+    try:
+        with open(list_path, 'w') as f:
+            for segment_path in segment_paths:
+                escaped = os.path.abspath(segment_path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        subprocess.run(
+            [
+                get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', list_path,
+                '-c', 'copy',
+                '-movflags', '+faststart',
+                output_path
+            ],
+            check=True,
+            capture_output=True
+        )
+    finally:
+        if os.path.exists(list_path):
+            os.remove(list_path)
+
+
+class _SegmentPlaylist:
+    """
+    HLS event playlist fed with finished timeline segments.
+
+    Each segment is remuxed, not re-encoded, to MPEG-TS at its offset in the
+    timeline and listed once written, so playback starts while later segments
+    are still encoding. The playlist is replaced atomically on every update.
+    """
+
+    def __init__(self, stream_dir: str, target_duration: int):
+        os.makedirs(stream_dir, exist_ok=True)
+        self.stream_dir = stream_dir
+        self.target_duration = max(target_duration, 1)
+        self.entries = []
+        self.offset = 0.0
+
+    def add(self, segment_path: str):
+        """Append a finished segment"""
+        name = f"segment_{len(self.entries):05d}.ts"
+        duration = _probe_duration(segment_path)
+        subprocess.run(
+            [
+                get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+                '-i', segment_path,
+                '-c', 'copy',
+                '-output_ts_offset', f"{self.offset:.6f}",
+                '-f', 'mpegts',
+                os.path.join(self.stream_dir, name)
+            ],
+            check=True,
+            capture_output=True
+        )
+        self.entries.append((name, duration))
+        self.offset += duration
+        self._write()
+
+    def finish(self):
+        """Mark the playlist complete"""
+        self._write(ended=True)
+
+    def _write(self, ended: bool = False):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for name, duration in self.entries:
+            lines += [f"#EXTINF:{duration:.3f},", name]
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+
+        tmp_path = os.path.join(self.stream_dir, f".{HLS_PLAYLIST_NAME}.{uuid.uuid4().hex}")
+        with open(tmp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, os.path.join(self.stream_dir, HLS_PLAYLIST_NAME))
+
+
+def _probe_duration(path: str) -> float:
+    """Duration of a media file in seconds"""
+    result = subprocess.run(
+        [
+            settings.FFPROBE_BINARY, '-v', 'error',
+            '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            path
+        ],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    return float(result.stdout.strip())
+
+
+def _write_hls(video, stream_dir: str, progress: Optional[Callable[[float], None]] = None):
+    """
+    Encode a video as an HLS event playlist.
+
+    ffmpeg appends each segment to the playlist as soon as it is closed, so the
+    segments listed in the playlist can be published while encoding continues.
+    """
+    os.makedirs(stream_dir, exist_ok=True)
+    segment_seconds = settings.HLS_SEGMENT_SECONDS
+
+    video.write_videofile(
+        os.path.join(stream_dir, HLS_PLAYLIST_NAME),
+        codec=settings.VIDEO_CODEC,
+        audio_codec=settings.AUDIO_CODEC,
+        preset=settings.VIDEO_PRESET,
+        fps=settings.RENDER_FPS,
+        # MoviePy names its temporary audio after the output file and puts it
+        # in the working directory, where concurrent renders would share it
+        temp_audiofile=os.path.join(stream_dir, f"audio_{uuid.uuid4().hex}.m4a"),
+        ffmpeg_params=[
+            '-force_key_frames', f"expr:gte(t,n_forced*{segment_seconds})",
+            '-f', 'hls',
+            '-hls_time', str(segment_seconds),
+            '-hls_playlist_type', 'event',
+            '-hls_segment_filename', os.path.join(stream_dir, 'segment_%05d.ts')
+        ],
+        verbose=False,
+        logger=_encode_logger(progress)
+    )
+
+
+class _EncodeProgressLogger(ProgressBarLogger):
+    """Forward MoviePy's per-frame progress bar to a fraction callback"""
+
+    def __init__(self, callback: Callable[[float], None]):
+        super().__init__()
+        self.callback = callback
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        # MoviePy iterates video frames under the 't' bar
+        if bar == 't' and attr == 'index':
+            total = self.bars[bar].get('total')
+            if total:
+                self.callback(value / total)
+
+
+def _encode_logger(progress: Optional[Callable[[float], None]]):
+    """Get a MoviePy logger reporting to ``progress``, or None to stay silent"""
+    return _EncodeProgressLogger(progress) if progress else None
+
+
+def _scaled(progress: Optional[Callable[[float], None]], start: float, span: float):
+    """Map a 0-1 sub-task fraction onto [start, start + span] of a callback"""
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + span * fraction)
+
+
+def _cancellable(progress: Optional[Callable[[float], None]], cancelled: Optional[Callable[[], bool]]):
+    """Wrap a progress callback so every call is also a cancellation point"""
+    if cancelled is None:
+        return progress
+
+    def callback(fraction: float):
+        if cancelled():
+            raise RenderCancelled()
+        if progress:
+            progress(fraction)
+    return callback
+
+
+def _remux_hls(playlist_path: str, output_path: str):
+    """Join HLS segments into a single MP4 without re-encoding"""
+    subprocess.run(
+        [
+            get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+            '-i', playlist_path,
+            '-c', 'copy', '-bsf:a', 'aac_adtstoasc',
+            '-movflags', '+faststart',
+            output_path
+        ],
+        check=True,
+        capture_output=True
+    )
+
+
+def _load_clip(file_path: str, start: float, end: float, is_image: bool = False):
+    """
+    Load a clip at the output frame size.
+
+    Still images go through the cached segment path, which is already
+    fitted; videos are scaled and letterboxed, since concatenation needs
+    every clip at the same size.
+    """
+    if is_image:
+        return VideoFileClip(get_image_segment(file_path, end - start))
+    return _fit_to_frame(VideoFileClip(file_path).subclip(start, end))
+
+
+def _fit_to_frame(clip):
+    """Scale a clip to fit the output frame, letterboxing the remainder"""
+    width, height = settings.RENDER_WIDTH, settings.RENDER_HEIGHT
+    if tuple(clip.size) == (width, height):
+        return clip
+
+    scale = min(width / clip.w, height / clip.h)
+    # Even dimensions, as yuv420p requires
+    clip = clip.resize(newsize=(max(int(clip.w * scale) // 2 * 2, 2), max(int(clip.h * scale) // 2 * 2, 2)))
+    return clip.on_color(size=(width, height), color=(0, 0, 0), pos='center')
+
+
+def _build_timeline(
+    clips: list,
+    transition_type: str,
+    transition_duration: float = TRANSITION_DURATION,
+    keys: Optional[List[str]] = None
+) -> List[Tuple[object, str]]:
+    """
+    Split clips into plain body segments and short transition windows.
+
+    Each cut consumes the last ``t`` seconds of the outgoing clip and the first
+    ``t`` seconds of the incoming one (like ffmpeg xfade). Only those windows are
+    blended frame by frame; the bodies stay on the plain chain concat path.
+
+    Args:
+        clips: Loaded clips in timeline order
+        transition_type: Transition effect ('fade', 'dissolve', 'glitch', 'none')
+        transition_duration: Requested overlap window length in seconds
+        keys: Content identity of each clip, used to label the pieces
+
+    Returns:
+        List of (clip, label) pairs in timeline order. The label describes
+        exactly what the piece shows, so equal labels mean equal frames.
+    """
+    keys = keys or [str(i) for i in range(len(clips))]
+
+    if transition_type not in TRANSITION_TYPES or len(clips) < 2:
+        return list(zip(clips, keys))
+
+    # Clamp every window so it never eats more than half of either neighbour
+    overlaps = [
+        min(transition_duration, clips[i].duration / 2, clips[i + 1].duration / 2)
+        for i in range(len(clips) - 1)
+    ]
+
+    timeline = []
+    for i, clip in enumerate(clips):
+        head = overlaps[i - 1] if i > 0 else 0
+        tail = overlaps[i] if i < len(overlaps) else 0
+
+        if clip.duration - head - tail > 0:
+            timeline.append((
+                clip.subclip(head, clip.duration - tail),
+                f"{keys[i]}[{head:.3f}:{clip.duration - tail:.3f}]"
+            ))
+
+        if tail > 0:
+            outgoing = clip.subclip(clip.duration - tail, clip.duration)
+            incoming = clips[i + 1].subclip(0, tail)
+            timeline.append((
+                _blend_window(outgoing, incoming, transition_type),
+                f"{keys[i]}[-{tail:.3f}:]>{keys[i + 1]}[:{tail:.3f}]/{transition_type}"
+            ))
+
+    return timeline
+
+
+def _fit_duration(timeline: List[Tuple[object, str]], duration: float) -> List[Tuple[object, str]]:
+    """
+    Trim a built timeline to ``duration`` seconds, or extend it by repeating
+    its last piece, so transitions, speed and filters are kept.
+
+    Args:
+        timeline: (clip, label) pairs from _build_timeline
+        duration: Target duration in seconds
+
+    Returns:
+        (clip, label) pairs adding up to the target duration
+    """
+    last = timeline[-1]
+    pieces = iter(timeline)
+    fitted = []
+    total = 0.0
+
+    # Stop within a frame of the target rather than append a sliver
+    while duration - total > 1.0 / settings.RENDER_FPS:
+        piece, label = next(pieces, last)
+        remaining = duration - total
+        if piece.duration > remaining:
+            piece, label = piece.subclip(0, remaining), f"{label}[:{remaining:.3f}]"
+        fitted.append((piece, label))
+        total += piece.duration
+
+    return fitted
+
+
+def _segment_name(label: str, filter_type: str, speed_factor: float, preset: str) -> str:
+    """Content-derived segment file name for a timeline piece"""
+    identity = "|".join([
+        SEGMENT_VERSION, label, filter_type, str(speed_factor),
+        settings.VIDEO_CODEC, settings.AUDIO_CODEC, preset,
+        str(settings.RENDER_FPS), str(settings.RENDER_WIDTH), str(settings.RENDER_HEIGHT)
+    ])
+    return f"segment_{hashlib.sha256(identity.encode()).hexdigest()[:32]}"
+
+
+def _blend_window(outgoing, incoming, transition_type: str):
+    """Blend the overlapping tail/head of two clips into one transition clip"""
+    window = outgoing.duration
+
+    if transition_type == 'fade':
+        # Dip to black: fade the outgoing half out, the incoming half in
+        half = window / 2
+        out_part = outgoing.subclip(0, half).fx(vfx.fadeout, half)
+        in_part = incoming.subclip(window - half, window).fx(vfx.fadein, half)
+        return concatenate_videoclips([out_part, in_part], method='chain')
+
+    incoming = incoming.resize(outgoing.size) if incoming.size != outgoing.size else incoming
+    blended = CompositeVideoClip(
+        [outgoing, incoming.crossfadein(window)],
+        size=outgoing.size
+    ).set_duration(window)
+
+    if transition_type == 'glitch':
+        return blended.fl(_glitch_frame)
+
+    return blended
+
+
+def _glitch_frame(get_frame, t):
+    """Shift colour channels and tear random rows of a transition frame"""
+    frame = get_frame(t).copy()
+    rng = np.random.default_rng(int(t * 1000))
+    shift = int(rng.integers(4, 16))
+
+    frame[:, :, 0] = np.roll(frame[:, :, 0], shift, axis=1)
+    frame[:, :, 2] = np.roll(frame[:, :, 2], -shift, axis=1)
+
+    height = frame.shape[0]
+    for _ in range(4):
+        top = int(rng.integers(0, max(height - 8, 1)))
+        band = slice(top, top + int(rng.integers(2, 8)))
+        frame[band] = np.roll(frame[band], int(rng.integers(-40, 40)), axis=1)
+
+    return frame
+
+
 def _add_text_overlays(video, overlays: List[dict]):
     """Add text overlays to video"""
     clips = [video]
@@ -1,37 +1,109 @@
 """Scene detection using PySceneDetect"""
 import logging
-from typing import List, Tuple
-from scenedetect import detect, AdaptiveDetector
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from scenedetect import open_video, AdaptiveDetector, SceneManager
+from scenedetect.scene_detector import SceneDetector
+from scenedetect.scene_manager import compute_downscale_factor
+from celery.exceptions import SoftTimeLimitExceeded
 
 logger = logging.getLogger(__name__)
 
+# Frames handed to on_frame are downscaled no further than this width
+# (the detection model works at 640 pixels)
+FRAME_HOOK_MIN_WIDTH = 640
 
-def detect_scenes(video_path: str) -> List[Tuple[float, float]]:
+
+class _FrameHook(SceneDetector):
+    """
+    Pass every decoded frame to a callback; detects no cuts of its own.
+
+    An error of the callback (e.g. the job was cancelled) stops detection and
+    is kept in ``error``. Raising it from inside the SceneManager would leave
+    its decode thread blocked with the video open.
+    """
+
+    def __init__(
+        self,
+        on_frame: Callable[[np.ndarray, Optional[float]], None],
+        total_frames: int,
+        stop: Callable[[], None]
+    ):
+        super().__init__()
+        self.on_frame = on_frame
+        self.total_frames = total_frames
+        self.stop = stop
+        self.error = None
+
+    def process_frame(self, frame_num: int, frame_img: np.ndarray) -> List[int]:
+        if self.error is None:
+            try:
+                self.on_frame(frame_img, frame_num / self.total_frames if self.total_frames else None)
+            except Exception as e:
+                self.error = e
+                self.stop()
+        return []
+
+
+def detect_scenes(
+    video_path: str,
+    on_frame: Optional[Callable[[np.ndarray, Optional[float]], None]] = None
+) -> List[Tuple[float, float]]:
     """
     Detect scene boundaries in a video.
 
     Args:
-        video_path: Path to the video file
+        video_path: Path or URL of the video (URLs are read as a stream)
+        on_frame: Called with every decoded frame and the fraction of the
+            video read so far (None if unknown), so other frame analysis
+            shares this decode
 
     Returns:
-        List of (start_sec, end_sec) tuples
+        List of (start_sec, end_sec) tuples covering the whole video
+
+    Raises:
+        Exception: The video could not be read; callers retry rather than
+            store an incomplete analysis
     """
+    # Presigned URLs carry credentials in their query string
+    source_name = video_path.split('?')[0]
     try:
-        # Detect scenes using adaptive detector
-        scenes = detect(video_path, AdaptiveDetector())
+        video = open_video(video_path)
+        manager = SceneManager()
+        hook = None
+        if on_frame:
+            try:
+                total_frames = video.duration.get_frames()
+            except Exception:
+                total_frames = 0
+            manager.auto_downscale = False
+            manager.downscale = compute_downscale_factor(video.frame_size[0], FRAME_HOOK_MIN_WIDTH)
+            hook = _FrameHook(on_frame, total_frames, manager.stop)
+            manager.add_detector(hook)
+        manager.add_detector(AdaptiveDetector())
+        manager.detect_scenes(video)
+        if hook and hook.error:
+            raise hook.error
 
         # Convert FrameTimecode objects to seconds
-        scene_intervals = []
-        for i in range(len(scenes)):
-            start_sec = float(scenes[i][0].get_seconds())
-            end_sec = float(scenes[i][1].get_seconds()) if i + 1 < len(scenes) else start_sec
-
-            scene_intervals.append((start_sec, end_sec))
+        scene_intervals = [
+            (float(start.get_seconds()), float(end.get_seconds()))
+            for start, end in manager.get_scene_list()
+        ]
+        if not scene_intervals:
+            # No cut found: the whole video is one scene
+            scene_intervals = [(0.0, float(video.position.get_seconds()))]
 
-        logger.info(f"Detected {len(scene_intervals)} scenes in {video_path}")
+        logger.info(f"Detected {len(scene_intervals)} scenes in {source_name}")
         return scene_intervals
 
+    except SoftTimeLimitExceeded:
+        # Let the worker checkpoint and resume instead of recording a failure
+        raise
     except Exception as e:
-        logger.error(f"Failed to detect scenes: {str(e)}")
-        # Return single full-video scene on failure
-        return [(0.0, float('inf'))]
+        message = str(e).replace(video_path, source_name)
+        logger.error(f"Failed to detect scenes in {source_name}: {message}")
+        if message != str(e):
+            # The video backend named the URL; the error ends up in logs and the job
+            raise RuntimeError(f"Failed to detect scenes in {source_name}: {message}") from None
+        raise
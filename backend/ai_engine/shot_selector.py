@@ -1,14 +1,18 @@
 """Shot selection using dynamic programming"""
 import logging
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever selection changes, so stored selections are made again
+SELECTOR_VERSION = "2"
+
 
 class Scene:
     """Represents a scene for selection"""
 
-    def __init__(self, start: float, end: float, tags: List[str], score: float = 5.0):
+    def __init__(self, start: float, end: float, tags: List[str], score: float = 5.0, asset_id: Optional[int] = None):
+        self.asset_id = asset_id
         self.start = start
         self.end = end
         self.duration = end - start
@@ -21,7 +25,7 @@ def select_shots(
     target_duration: int = 60,
     include_tags: List[str] = None,
     exclude_tags: List[str] = None
-) -> List[Tuple[float, float]]:
+) -> List[Tuple[Optional[int], float, float]]:
     """
     Select optimal shots using dynamic programming.
 
@@ -32,7 +36,7 @@ def select_shots(
         exclude_tags: Exclude scenes containing these tags
 
     Returns:
-        List of selected (start_sec, end_sec) tuples
+        List of selected (asset_id, start_sec, end_sec) tuples, in input order
     """
     include_tags = set(include_tags) if include_tags else set()
     exclude_tags = set(exclude_tags) if exclude_tags else set()
@@ -68,7 +72,7 @@ def select_shots(
     result = []
     for idx in sorted(selected_indices):
         scene = filtered_scenes[idx]
-        result.append((scene.start, scene.end))
+        result.append((scene.asset_id, scene.start, scene.end))
 
     total_sec = sum(s.end - s.start for s in [filtered_scenes[i] for i in selected_indices])
     logger.info(f"Selected {len(result)} shots, total duration: {total_sec:.1f}s")
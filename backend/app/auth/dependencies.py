@@ -0,0 +1,131 @@
+"""Shared authentication dependency with cached user and ownership lookups"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import get_async_db
+from app.models import User, Project
+from app.auth.jwt import decode_token
+
+logger = logging.getLogger(__name__)
+
+security = HTTPBearer()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, detached from any database session"""
+    id: int
+    email: str
+    username: str
+
+
+class _TTLCache:
+    """Bounded in-process cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+# Per process. A user deactivated through another process stays signed in
+# there for at most AUTH_CACHE_TTL_SECONDS.
+_principals = _TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+# Project owners never change, only deleted projects have to be forgotten
+_project_owners = _TTLCache(settings.OWNERSHIP_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Get current user from JWT token"""
+    # Signature and expiry are checked on every request; only the user lookup is cached
+    payload = decode_token(credentials.credentials)
+
+    if not payload or "sub" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        user_id = int(payload.get("sub"))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    principal = _principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="User account is inactive")
+
+    principal = Principal(id=user.id, email=user.email, username=user.username)
+    _principals.set(user_id, principal)
+    return principal
+
+
+async def user_owns_project(db: AsyncSession, project_id: int, user_id: int) -> bool:
+    """Whether a project exists and belongs to the user"""
+    owner_id = _project_owners.get(project_id)
+    if owner_id is None:
+        owner_id = (await db.execute(
+            select(Project.user_id).where(Project.id == project_id)
+        )).scalar()
+        if owner_id is None:
+            return False
+        _project_owners.set(project_id, owner_id)
+    return owner_id == user_id
+
+
+def invalidate_user(user_id: int):
+    """Drop a user's cached principal, e.g. after deactivation"""
+    _principals.delete(user_id)
+
+
+def forget_project(project_id: int):
+    """Drop a deleted project's cached owner"""
+    _project_owners.delete(project_id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+@event.listens_for(Project, "after_delete")
+def _project_deleted(mapper, connection, target):
+    forget_project(target.id)
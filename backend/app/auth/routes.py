@@ -1,8 +1,10 @@
 """Authentication routes"""
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import User
 from app.schemas import (
     RegisterRequest, LoginRequest, TokenResponse, UserResponse
@@ -14,12 +16,12 @@ router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(req: RegisterRequest, db: Session = Depends(get_db)):
+async def register(req: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user exists
-    existing_user = db.query(User).filter(
-        (User.email == req.email) | (User.username == req.username)
-    ).first()
+    existing_user = (await db.execute(
+        select(User).where((User.email == req.email) | (User.username == req.username))
+    )).scalars().first()
 
     if existing_user:
         raise HTTPException(
@@ -31,21 +33,22 @@ async def register(req: RegisterRequest, db: Session = Depends(get_db)):
     user = User(
         email=req.email,
         username=req.username,
-        hashed_password=hash_password(req.password),
+        # bcrypt is deliberately slow; keep it off the event loop
+        hashed_password=await run_in_threadpool(hash_password, req.password),
         full_name=req.full_name
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(req: LoginRequest, db: Session = Depends(get_db)):
+async def login(req: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Login user and return JWT token"""
-    user = db.query(User).filter(User.email == req.email).first()
+    user = (await db.execute(select(User).where(User.email == req.email))).scalars().first()
 
-    if not user or not verify_password(req.password, user.hashed_password):
+    if not user or not await run_in_threadpool(verify_password, req.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -72,12 +75,12 @@ async def login(req: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(db: Session = Depends(get_db), user_id: int = None):
+async def refresh_token(db: AsyncSession = Depends(get_async_db), user_id: int = None):
     """Refresh JWT token"""
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
@@ -1,25 +1,33 @@
 """Database configuration and session management"""
 import logging
-from sqlalchemy import create_engine, event, pool
+from typing import AsyncIterator
+from sqlalchemy import Enum, create_engine, event, pool, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Create engine with proper pooling for Railway
+# Pool sizing is per process: each uvicorn worker and each Celery worker
+# process holds its own pool
+_pool_options = {
+    "pool_pre_ping": True,  # Verify connections before using
+    "pool_recycle": 3600,  # Recycle connections after 1 hour
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+} if not settings.DEBUG else {"poolclass": pool.NullPool}
+
+# Sync engine: Celery workers and schema setup
 engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    pool_size=5,  # Reduced for Railway
-    max_overflow=10,
+    **_pool_options,
     connect_args={
         "connect_timeout": 10,
         "application_name": "ai_video_editor"
-    },
-    poolclass=pool.QueuePool if not settings.DEBUG else pool.NullPool
+    }
 )
 
 # Handle connection events for better error handling
@@ -33,6 +41,33 @@ def receive_connect(dbapi_conn, connection_record):
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url(url: str) -> str:
+    """Point a postgres URL at the asyncpg driver"""
+    scheme, rest = url.split("://", 1)
+    if scheme in ("postgres", "postgresql") or scheme.startswith("postgresql+"):
+        scheme = "postgresql+asyncpg"
+    # asyncpg names libpq's sslmode parameter ssl
+    return f"{scheme}://{rest.replace('sslmode=', 'ssl=')}"
+
+
+# Async engine: FastAPI routes, so queries never block the event loop
+async_engine = create_async_engine(
+    _async_url(settings.DATABASE_URL),
+    echo=settings.DEBUG,
+    **_pool_options,
+    connect_args={
+        "timeout": 10,
+        "server_settings": {
+            "application_name": "ai_video_editor",
+            "search_path": "public"
+        }
+    }
+)
+
+# Objects stay readable after commit; lazy loads are not possible in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Declarative base for models
 Base = declarative_base()
 
@@ -50,11 +85,50 @@ def get_db() -> Session:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {e}")
+            await db.rollback()
+            raise
+
+
+def _add_enum_values():
+    """
+    Add enum values introduced since the tables were created.
+
+    create_all never alters an existing Postgres enum type, so a new model
+    status would otherwise fail every write that uses it.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if not isinstance(column.type, Enum):
+                    continue
+                # The type actually in use; tables may predate the model's type name
+                type_name = conn.execute(text(
+                    "SELECT t.typname FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid "
+                    "WHERE a.attrelid = to_regclass(:table) AND a.attname = :column AND t.typtype = 'e'"
+                ), {"table": table.name, "column": column.name}).scalar()
+                if not type_name:
+                    continue
+                for value in column.type.enums:
+                    conn.execute(text(f'ALTER TYPE "{type_name}" ADD VALUE IF NOT EXISTS \'{value}\''))
+
+
 def init_db():
     """Initialize database tables"""
     try:
         logger.info("Initializing database...")
         Base.metadata.create_all(bind=engine)
+        _add_enum_values()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -1,122 +1,182 @@
 """Jobs routes"""
+import logging
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.database import get_db
-from app.models import User, Project, Job
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.models import Asset, Job
 from app.schemas import JobResponse, EditRequest
-from app.auth.jwt import decode_token
-from app.workers.tasks import process_edit_job
-from fastapi.security import HTTPBearer, HTTPAuthCredentials
+from app.auth.dependencies import Principal, get_current_user, user_owns_project
+from workers.dispatch import dispatch_ready, release_slot, start_job, stop_job
+from workers.progress import get_live_progress
+from workers import scheduler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/jobs", tags=["jobs"])
-security = HTTPBearer()
 
 
-def get_current_user(credentials: HTTPAuthCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
-    """Get current user from JWT token"""
-    token = credentials.credentials
-    payload = decode_token(token)
+def _live_progress(job: Job) -> JobResponse:
+    """Overlay the worker's latest Redis progress (or queue position) on the stored job row"""
+    response = JobResponse.model_validate(job)
+    if job.status == "pending":
+        response.queue_position = scheduler.queue_position(job.id)
+    elif job.status == "processing":
+        live = get_live_progress(job.id)
+        if live:
+            response.progress = max(response.progress or 0.0, live["progress"])
+            response.eta_seconds = live.get("eta_seconds")
+    return response
 
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    user_id = payload.get("sub")
-    try:
-        user_id = int(user_id)
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def _with_live_progress(job: Job) -> JobResponse:
+    """Build the response without blocking the event loop on Redis"""
+    return await run_in_threadpool(_live_progress, job)
+
+
+async def _cancel_job(db: AsyncSession, job: Job):
+    """
+    Cancel a queued or running job.
+
+    The job's tasks stop at their next cancellation point, queued ones as
+    soon as they start; only the orchestration task is revoked, in case it
+    has not started yet. A job finishing meanwhile stays cancelled (see
+    workers.tasks._complete_job). The job's scheduler slot goes to the next
+    queued job. Redis and broker calls run in a thread.
+    """
+    await run_in_threadpool(stop_job, job.id, job.task_id)
+
+    job.status = "cancelled"
+    job.completed_at = datetime.utcnow()
+    await db.commit()
+    logger.info(f"Cancelled job {job.id}")
+
+    await run_in_threadpool(release_slot, job.id)
+
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+async def _get_owned_job(db: AsyncSession, job_id: int, user_id: int) -> Job:
+    """Load a job, or raise 404/403 unless it belongs to one of the user's projects"""
+    job = await db.get(Job, job_id)
 
-    return user
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Verify user owns this job's project
+    if not await user_owns_project(db, job.project_id, user_id):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    return job
 
 
 @router.post("/project/{project_id}/start-edit", response_model=JobResponse)
 async def start_edit(
     project_id: int,
     req: EditRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Start video editing for a project"""
     # Verify project belongs to user and has assets
-    project = db.query(Project).filter(
-        (Project.id == project_id) & (Project.user_id == current_user.id)
-    ).first()
-
-    if not project:
+    if not await user_owns_project(db, project_id, current_user.id):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    if not project.assets:
+    has_assets = (await db.execute(
+        select(Asset.id).where(Asset.project_id == project_id).limit(1)
+    )).first()
+    if not has_assets:
         raise HTTPException(status_code=400, detail="Project has no assets")
 
+    # A new edit supersedes any unfinished one of the same project
+    unfinished = (await db.execute(
+        select(Job).where((Job.project_id == project_id) & (Job.status.in_(["pending", "processing"])))
+    )).scalars().all()
+
     # Create job record
     job = Job(project_id=project_id, status="pending")
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
+
+    # Queue under the user's fair share; the job starts once it gets a slot
+    queued = True
+    try:
+        await run_in_threadpool(scheduler.submit, current_user.id, project_id, job.id, preview=req.preview)
+    except scheduler.SchedulerFull as e:
+        await db.delete(job)
+        await db.commit()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.warning(f"Scheduler unavailable, dispatching job {job.id} directly: {str(e)}")
+        queued = False
+
+    # Only once the new job is admitted, so a rejected edit leaves the old one running
+    for previous in unfinished:
+        await _cancel_job(db, previous)
 
     # Dispatch Celery task
     try:
-        celery_task = process_edit_job.delay(project_id=project_id, job_id=job.id)
-        job.task_id = celery_task.id
-        db.commit()
-        db.refresh(job)
+        if queued:
+            await run_in_threadpool(dispatch_ready)
+        else:
+            celery_task = await run_in_threadpool(start_job, project_id, job.id, req.preview)
+            job.task_id = celery_task.id
+            await db.commit()
+        await db.refresh(job)
     except Exception as e:
         job.status = "failed"
         job.error = str(e)
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=500, detail=f"Failed to start job: {str(e)}")
 
-    return job
+    return await _with_live_progress(job)
 
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(
     job_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get job status"""
-    job = db.query(Job).filter(Job.id == job_id).first()
+    job = await _get_owned_job(db, job_id, current_user.id)
+    return await _with_live_progress(job)
 
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
 
-    # Verify user owns this job's project
-    project = db.query(Project).filter(
-        (Project.id == job.project_id) & (Project.user_id == current_user.id)
-    ).first()
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel(
+    job_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Cancel a queued or running job"""
+    job = await _get_owned_job(db, job_id, current_user.id)
 
-    if not project:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    if job.status not in ("pending", "processing"):
+        raise HTTPException(status_code=400, detail=f"Job is already {job.status}")
 
-    return job
+    await _cancel_job(db, job)
+    await db.refresh(job)
+    return await _with_live_progress(job)
 
 
 @router.get("/project/{project_id}/latest", response_model=JobResponse)
 async def get_latest_job(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get latest job for a project"""
     # Verify project belongs to user
-    project = db.query(Project).filter(
-        (Project.id == project_id) & (Project.user_id == current_user.id)
-    ).first()
-
-    if not project:
+    if not await user_owns_project(db, project_id, current_user.id):
         raise HTTPException(status_code=404, detail="Project not found")
 
-    job = db.query(Job).filter(
-        Job.project_id == project_id
-    ).order_by(desc(Job.created_at)).first()
+    job = (await db.execute(
+        select(Job).where(Job.project_id == project_id).order_by(desc(Job.created_at)).limit(1)
+    )).scalars().first()
 
     if not job:
         raise HTTPException(status_code=404, detail="No jobs found for this project")
 
-    return job
+    return await _with_live_progress(job)
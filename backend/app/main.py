@@ -35,6 +35,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 # Health endpoints - MUST work before anything else
@@ -72,11 +73,14 @@ try:
     from app.projects.routes import router as projects_router
     from app.assets.routes import router as assets_router
     from app.jobs.routes import router as jobs_router
+    from app.metrics.routes import router as metrics_router
     
-    app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
-    app.include_router(projects_router, prefix="/api/projects", tags=["projects"])
-    app.include_router(assets_router, prefix="/api/assets", tags=["assets"])
-    app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
+    # Each router carries its own /api/... prefix
+    app.include_router(auth_router)
+    app.include_router(projects_router)
+    app.include_router(assets_router)
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
     logger.info("✓ All routers loaded")
 except Exception as e:
     logger.warning(f"⚠️ Router load failed (app will still respond to /health): {e}")
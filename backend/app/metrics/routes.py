@@ -0,0 +1,17 @@
+"""Operational metrics routes"""
+import logging
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from app.auth.dependencies import Principal, get_current_user
+from ai_engine.prompt_cache import get_prompt_cache
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("/prompt-cache")
+async def prompt_cache_metrics(current_user: Principal = Depends(get_current_user)):
+    """Prompt parse cache hit and miss counters"""
+    # Reads Redis; keep it off the event loop
+    return await run_in_threadpool(get_prompt_cache().stats)
@@ -83,6 +83,7 @@ class Job(Base):
         PROCESSING = "processing"
         COMPLETED = "completed"
         FAILED = "failed"
+        CANCELLED = "cancelled"
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
@@ -98,3 +99,24 @@ class Job(Base):
 
     # Relationships
     project = relationship("Project", back_populates="jobs")
+
+
+class RenderOutput(Base):
+    """Index of rendered outputs by canonical EDL hash"""
+    __tablename__ = "render_outputs"
+
+    edl_hash = Column(String(64), primary_key=True)
+    output_key = Column(String(500), nullable=False)
+    edl = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StageResult(Base):
+    """Latest output of an edit pipeline stage, keyed by a hash of its inputs"""
+    __tablename__ = "stage_results"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(String(50), primary_key=True)
+    input_hash = Column(String(64), nullable=False)
+    output = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,42 +1,48 @@
 """Projects routes"""
+import logging
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Project
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.database import get_async_db
+from app.models import Project
 from app.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
-from app.auth.jwt import decode_token
-from fastapi.security import HTTPBearer, HTTPAuthCredentials
+from app.auth.dependencies import Principal, get_current_user
+from workers.dispatch import parse_prompt
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
-security = HTTPBearer()
 
 
-def get_current_user(credentials: HTTPAuthCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
-    """Get current user from JWT token"""
-    token = credentials.credentials
-    payload = decode_token(token)
+async def _get_project(db: AsyncSession, project_id: int, user_id: int) -> Optional[Project]:
+    """Load a user's project with its assets (responses include them)"""
+    result = await db.execute(
+        select(Project)
+        .where((Project.id == project_id) & (Project.user_id == user_id))
+        .options(selectinload(Project.assets))
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
 
-    if not payload or "sub" not in payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    user_id = payload.get("sub")
+async def _preparse_prompt(project: Project):
+    """Queue parsing of a saved prompt so it overlaps the user's uploads"""
+    if not project.prompt:
+        return
     try:
-        user_id = int(user_id)
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return user
+        await run_in_threadpool(parse_prompt, project.id)
+    except Exception as e:
+        logger.warning(f"Failed to queue prompt parsing for project {project.id}: {str(e)}")
 
 
 @router.post("/", response_model=ProjectResponse)
 async def create_project(
     req: ProjectCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new project"""
     project = Project(
@@ -45,36 +51,40 @@ async def create_project(
         prompt=req.prompt
     )
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    project = await _get_project(db, project.id, current_user.id)
+    await _preparse_prompt(project)
     return project
 
 
 @router.get("/", response_model=list[ProjectResponse])
 async def list_projects(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 50
 ):
     """List all projects for current user"""
-    projects = db.query(Project).filter(
-        Project.user_id == current_user.id
-    ).offset(skip).limit(limit).order_by(Project.created_at.desc()).all()
+    result = await db.execute(
+        select(Project)
+        .where(Project.user_id == current_user.id)
+        .options(selectinload(Project.assets))
+        .order_by(Project.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
 
-    return projects
+    return result.scalars().all()
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific project"""
-    project = db.query(Project).filter(
-        (Project.id == project_id) & (Project.user_id == current_user.id)
-    ).first()
+    project = await _get_project(db, project_id, current_user.id)
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -86,42 +96,41 @@ async def get_project(
 async def update_project(
     project_id: int,
     req: ProjectUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a project"""
-    project = db.query(Project).filter(
-        (Project.id == project_id) & (Project.user_id == current_user.id)
-    ).first()
+    project = await _get_project(db, project_id, current_user.id)
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     if req.title is not None:
         project.title = req.title
+    prompt_changed = req.prompt is not None and req.prompt != project.prompt
     if req.prompt is not None:
         project.prompt = req.prompt
 
-    db.commit()
-    db.refresh(project)
+    await db.commit()
+    project = await _get_project(db, project_id, current_user.id)
+    if prompt_changed:
+        await _preparse_prompt(project)
     return project
 
 
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a project"""
-    project = db.query(Project).filter(
-        (Project.id == project_id) & (Project.user_id == current_user.id)
-    ).first()
+    project = await _get_project(db, project_id, current_user.id)
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    db.delete(project)
-    db.commit()
+    await db.delete(project)
+    await db.commit()
 
     return {"message": "Project deleted successfully"}
@@ -0,0 +1,25 @@
+"""Shared Redis connection"""
+import logging
+import threading
+import redis
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    """Get or create the process-wide Redis client"""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_timeout=2,
+                    socket_connect_timeout=2
+                )
+    return _redis_client
@@ -99,6 +99,8 @@ class JobResponse(JobBase):
     result: Optional[dict]
     error: Optional[str]
     progress: float
+    eta_seconds: Optional[float] = None
+    queue_position: Optional[int] = None  # while pending: jobs starting before this one
     started_at: Optional[datetime]
     completed_at: Optional[datetime]
     created_at: datetime
@@ -145,4 +147,4 @@ class JobStatusRequest(BaseModel):
 
 class EditRequest(BaseModel):
     """Request to start video editing"""
-    pass
+    preview: bool = False  # scheduled ahead of final renders
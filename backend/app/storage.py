@@ -0,0 +1,49 @@
+"""Shared S3 client for API routes and workers"""
+import os
+import logging
+import threading
+import boto3
+from botocore.config import Config
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_s3_client = None
+_s3_client_pid = None
+_s3_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Get the process-wide S3 client.
+
+    The client is created lazily on first use and reused afterwards, so
+    credential resolution and the connection pool are paid once per process.
+    boto3 clients are thread-safe. Presigning with it needs no network I/O.
+    A forked child (e.g. a Celery prefork worker) builds its own client instead
+    of sharing its parent's sockets.
+    """
+    global _s3_client, _s3_client_pid
+    pid = os.getpid()
+    if _s3_client is None or _s3_client_pid != pid:
+        with _s3_lock:
+            if _s3_client is None or _s3_client_pid != pid:
+                s3_config = Config(
+                    signature_version='s3v4',
+                    retries={'max_attempts': 3},
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True
+                )
+
+                _s3_client = boto3.client(
+                    's3',
+                    endpoint_url=settings.S3_ENDPOINT_URL or None,
+                    aws_access_key_id=settings.S3_ACCESS_KEY,
+                    aws_secret_access_key=settings.S3_SECRET_KEY,
+                    region_name=settings.S3_REGION,
+                    use_ssl=settings.S3_USE_SSL,
+                    config=s3_config
+                )
+                _s3_client_pid = pid
+                logger.info(f"Created S3 client for process {pid}")
+    return _s3_client
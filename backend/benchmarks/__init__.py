@@ -0,0 +1 @@
+"""Benchmarks and load tests, run by hand (python -m benchmarks.<name>)"""
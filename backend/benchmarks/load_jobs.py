@@ -0,0 +1,76 @@
+"""Latency percentiles of GET /api/jobs/{id} under concurrent load"""
+import json
+import argparse
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+
+def request_job(base_url: str, token: str, job_id: int, timeout: float) -> Optional[float]:
+    """
+    Fetch one job.
+
+    Args:
+        base_url: API root, e.g. http://localhost:8000
+        token: Bearer token of the job's owner
+        job_id: Job to fetch
+        timeout: Seconds before the request counts as failed
+
+    Returns:
+        Latency in milliseconds, or None if the request failed
+    """
+    request = urllib.request.Request(
+        f"{base_url}/api/jobs/{job_id}",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            json.loads(response.read())
+    except Exception:
+        return None
+    return (time.perf_counter() - started) * 1000
+
+
+def percentile(latencies: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a sorted list"""
+    rank = max(0, min(len(latencies) - 1, round(pct / 100 * len(latencies)) - 1))
+    return latencies[rank]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Access token from /api/auth/login")
+    parser.add_argument("--job-id", type=int, required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Warm up the connection pools and the auth caches first
+    for _ in range(args.concurrency):
+        request_job(args.url, args.token, args.job_id, args.timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(
+            lambda _: request_job(args.url, args.token, args.job_id, args.timeout),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency in results if latency is not None)
+    failed = len(results) - len(latencies)
+    print(f"{len(results)} requests, {args.concurrency} concurrent, {failed} failed, "
+          f"{len(results) / elapsed:,.0f} requests/s")
+    if latencies:
+        print(f"p50 {percentile(latencies, 50):.1f} ms  p95 {percentile(latencies, 95):.1f} ms  "
+              f"p99 {percentile(latencies, 99):.1f} ms  max {latencies[-1]:.1f} ms  "
+              f"mean {statistics.mean(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
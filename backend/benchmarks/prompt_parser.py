@@ -0,0 +1,121 @@
+"""Throughput of the rule-based prompt parser against the substring checks it replaced"""
+import re
+import random
+import logging
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+from ai_engine.prompt_parser import parse_prompt_rule_based
+
+FILLER = (
+    "create a short video from my trip to the mountains with friends and family showing the best "
+    "moments of our hike lake picnic campfire evening and make sure the dog appears often please"
+).split()
+KEYWORDS = [
+    "vintage", "30 seconds", "upbeat music", "slow motion", "fade transitions", "black and white",
+    "fast paced", "1 minute", "cinematic", "glitch", "45s", "2 mins", "b&w", "slow-mo", "sped up"
+]
+
+
+def substring_rules(prompt: str) -> Dict:
+    """The previous parser: one substring check per keyword, in priority order"""
+    prompt_lower = prompt.lower()
+
+    duration = None
+    if '30 second' in prompt_lower:
+        duration = 30
+    elif '1 minute' in prompt_lower:
+        duration = 60
+    elif '2 minute' in prompt_lower:
+        duration = 120
+    elif match := re.search(r'(\d+)\s*(?:second|sec|s)', prompt_lower):
+        duration = int(match.group(1))
+
+    filter_type = 'none'
+    if 'vintage' in prompt_lower or 'retro' in prompt_lower:
+        filter_type = 'vintage'
+    elif 'black and white' in prompt_lower or 'b&w' in prompt_lower or 'monochrome' in prompt_lower:
+        filter_type = 'b&w'
+    elif 'sepia' in prompt_lower or 'brown' in prompt_lower:
+        filter_type = 'sepia'
+
+    speed = 'normal'
+    if 'slow' in prompt_lower or 'slow motion' in prompt_lower:
+        speed = 'slow'
+    elif 'fast' in prompt_lower or 'speed up' in prompt_lower or '2x' in prompt_lower:
+        speed = 'fast'
+
+    music_mood = 'none'
+    if 'upbeat' in prompt_lower or 'energetic' in prompt_lower or 'fun' in prompt_lower:
+        music_mood = 'upbeat'
+    elif 'calm' in prompt_lower or 'relaxing' in prompt_lower or 'peaceful' in prompt_lower:
+        music_mood = 'calm'
+    elif 'cinematic' in prompt_lower or 'epic' in prompt_lower or 'dramatic' in prompt_lower:
+        music_mood = 'cinematic'
+
+    transition = 'none'
+    if 'fade' in prompt_lower:
+        transition = 'fade'
+    elif 'dissolve' in prompt_lower:
+        transition = 'dissolve'
+    elif 'glitch' in prompt_lower:
+        transition = 'glitch'
+
+    pacing = 'medium'
+    if 'fast' in prompt_lower and 'pacing' in prompt_lower:
+        pacing = 'fast'
+    elif 'slow' in prompt_lower and 'pacing' in prompt_lower:
+        pacing = 'slow'
+
+    return {
+        'duration': duration,
+        'filter': filter_type,
+        'speed': speed,
+        'music_mood': music_mood,
+        'include_tags': [],
+        'exclude_tags': [],
+        'transition': transition,
+        'pacing': pacing,
+        'text_overlays': []
+    }
+
+
+def make_prompts(count: int, seed: int = 0) -> List[str]:
+    """Prompts of 10-40 filler words with up to three editing keywords"""
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(10, 40))]
+        for keyword in rng.sample(KEYWORDS, rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), keyword)
+        prompts.append(" ".join(words))
+    return prompts
+
+
+def throughput(parse: Callable[[str], Dict], prompts: List[str], rounds: int) -> float:
+    """Median prompts per second over several rounds"""
+    rates = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for prompt in prompts:
+            parse(prompt)
+        rates.append(len(prompts) / (time.perf_counter() - started))
+    return statistics.median(rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=7)
+    args = parser.parse_args()
+
+    # Both parsers are measured without the per-call log line
+    logging.disable(logging.INFO)
+    prompts = make_prompts(args.prompts)
+    for name, parse in (("substring checks", substring_rules), ("single pass", parse_prompt_rule_based)):
+        print(f"{name:>16}: {throughput(parse, prompts, args.rounds):>9,.0f} prompts/s")
+
+
+if __name__ == "__main__":
+    main()
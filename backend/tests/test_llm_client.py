@@ -0,0 +1,114 @@
+"""Ollama client against a local fake Ollama server"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("pydantic_settings")
+
+from ai_engine.llm_client import CircuitBreaker, LLMUnavailable, OllamaClient  # noqa: E402
+
+SCHEMA = {"type": "object"}
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams a JSON object as NDJSON tokens, or fails partway when ``server.failing``"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens = ['{"filter": ', '"sepia", ', '"speed": "fast"', "}"]
+        if self.server.failing:
+            messages = [{"response": tokens[0]}, {"error": "model runner crashed"}]
+        else:
+            messages = [{"response": token} for token in tokens[:-1]]
+            messages.append({"response": tokens[-1], "done": True})
+
+        for message in messages:
+            line = (json.dumps(message) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    httpd.connections = 0
+    httpd.requests = 0
+    httpd.failing = False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = OllamaClient(base_url=f"http://127.0.0.1:{server.server_address[1]}", model="test")
+    client.breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    return client
+
+
+def test_streamed_object_is_assembled(client):
+    assert client.generate_json("make it sepia", SCHEMA) == {"filter": "sepia", "speed": "fast"}
+
+
+def test_connection_is_pooled(client, server):
+    for _ in range(3):
+        client.generate_json("make it sepia", SCHEMA)
+
+    assert server.requests == 3
+    assert server.connections == 1
+
+
+def test_breaker_opens_after_failures(client, server):
+    server.failing = True
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable, match="model runner crashed"):
+            client.generate_json("make it sepia", SCHEMA)
+
+    # Open: refused without reaching the server
+    with pytest.raises(LLMUnavailable, match="circuit is open"):
+        client.generate_json("make it sepia", SCHEMA)
+    assert server.requests == 2
+
+
+def test_breaker_half_opens_after_cooldown(client, server):
+    server.failing = True
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable):
+            client.generate_json("make it sepia", SCHEMA)
+    time.sleep(0.25)
+
+    # A failed trial call opens the breaker again
+    with pytest.raises(LLMUnavailable, match="model runner crashed"):
+        client.generate_json("make it sepia", SCHEMA)
+    with pytest.raises(LLMUnavailable, match="circuit is open"):
+        client.generate_json("make it sepia", SCHEMA)
+    assert server.requests == 3
+
+    # A successful trial call closes it
+    server.failing = False
+    time.sleep(0.25)
+    assert client.generate_json("make it sepia", SCHEMA) == {"filter": "sepia", "speed": "fast"}
+    assert client.generate_json("make it sepia", SCHEMA) == {"filter": "sepia", "speed": "fast"}
+    assert server.requests == 5
@@ -0,0 +1,22 @@
+"""Shot selection keeps each shot's asset"""
+from ai_engine.shot_selector import Scene, select_shots
+
+
+def test_scenes_with_equal_boundaries_keep_their_assets():
+    # Every image becomes a 0-3s scene
+    scenes = [Scene(0, 3.0, ["dog"], asset_id=asset_id) for asset_id in (7, 8, 9)]
+
+    selected = select_shots(scenes, target_duration=9)
+
+    assert selected == [(7, 0, 3.0), (8, 0, 3.0), (9, 0, 3.0)]
+
+
+def test_excluded_scenes_are_dropped_with_their_assets():
+    scenes = [
+        Scene(0, 4.0, ["dog"], asset_id=1),
+        Scene(0, 4.0, ["car"], asset_id=2),
+    ]
+
+    selected = select_shots(scenes, target_duration=8, exclude_tags=["car"])
+
+    assert selected == [(1, 0, 4.0)]
@@ -0,0 +1,29 @@
+"""Smoke tests: the API imports and serves every router"""
+import pytest
+
+pytest.importorskip("fastapi")
+
+
+def test_routes_registered():
+    from app.main import app
+
+    paths = {route.path for route in app.routes}
+    # Paths the frontend calls (frontend/src/services/api.js)
+    for path in (
+        "/api/health",
+        "/api/auth/register",
+        "/api/auth/login",
+        "/api/auth/refresh",
+        "/api/projects/",
+        "/api/projects/{project_id}",
+        "/api/assets/presigned-url",
+        "/api/assets/confirm-upload/{project_id}",
+        "/api/assets/project/{project_id}",
+        "/api/assets/{asset_id}",
+        "/api/jobs/project/{project_id}/start-edit",
+        "/api/jobs/project/{project_id}/latest",
+        "/api/jobs/{job_id}",
+        "/api/jobs/{job_id}/cancel",
+        "/api/metrics/prompt-cache",
+    ):
+        assert path in paths, f"{path} is not registered"
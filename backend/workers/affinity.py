@@ -0,0 +1,273 @@
+"""Cache-affinity routing: send tasks to workers that already hold their assets"""
+import json
+import bisect
+import hashlib
+import logging
+import threading
+from typing import List, Optional
+from redis.exceptions import WatchError
+from app.config import settings
+from app.redis_client import get_redis
+from workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+WORKERS_KEY = "affinity:workers:{pool}"  # set of workers consuming a pool queue
+CONCURRENCY_KEY = "affinity:concurrency"  # hash: worker name -> concurrency
+HEARTBEAT_KEY = "affinity:heartbeat:{worker}"
+LOAD_KEY = "affinity:load:{worker}"
+HOLDER_KEY = "affinity:holder:{shard}"
+SWEEP_KEY = "affinity:sweep"  # held by the worker sweeping dead workers' queues
+
+# Virtual nodes per worker on the hash ring, for an even shard spread
+RING_REPLICAS = 64
+
+# Workers of this process that are shutting down; their heartbeat stops
+_retired = set()
+
+
+def worker_queue(worker_name: str) -> str:
+    """Name of the dedicated queue a worker consumes besides the shared one"""
+    return f"worker.{worker_name}"
+
+
+def project_shard(project_id: int) -> str:
+    return f"project:{project_id}"
+
+
+def asset_shard(storage_key: str) -> str:
+    return f"asset:{storage_key}"
+
+
+def _hash(value: str) -> int:
+    return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+
+def register_worker(worker_name: str, concurrency: int, pools: List[str]):
+    """Advertise a worker in the pools it consumes and start its heartbeat"""
+    redis_client = get_redis()
+    redis_client.hset(CONCURRENCY_KEY, worker_name, concurrency)
+    for pool in pools:
+        redis_client.sadd(WORKERS_KEY.format(pool=pool), worker_name)
+    # Whatever a previous incarnation was running is gone
+    redis_client.set(LOAD_KEY.format(worker=worker_name), 0)
+    _heartbeat(worker_name)
+    logger.info(f"Registered {worker_name} for affinity routing in {pools} (concurrency {concurrency})")
+
+
+def retire_worker(worker_name: str):
+    """
+    Stop routing to a worker that is shutting down.
+
+    It stays registered until the next sweep has moved whatever is still
+    waiting on its queue back to the shared queues.
+    """
+    _retired.add(worker_name)
+    try:
+        get_redis().delete(HEARTBEAT_KEY.format(worker=worker_name), LOAD_KEY.format(worker=worker_name))
+    except Exception as e:
+        logger.warning(f"Failed to retire {worker_name}: {str(e)}")
+
+
+def unregister_worker(worker_name: str, pools: List[str]):
+    """Remove a worker from the hash rings of its pools"""
+    try:
+        redis_client = get_redis()
+        for pool in pools:
+            redis_client.srem(WORKERS_KEY.format(pool=pool), worker_name)
+        redis_client.hdel(CONCURRENCY_KEY, worker_name)
+        redis_client.delete(HEARTBEAT_KEY.format(worker=worker_name), LOAD_KEY.format(worker=worker_name))
+    except Exception as e:
+        logger.warning(f"Failed to unregister {worker_name}: {str(e)}")
+
+
+def _heartbeat(worker_name: str):
+    """Refresh the liveness key and schedule the next refresh"""
+    if worker_name in _retired:
+        return
+    try:
+        get_redis().set(
+            HEARTBEAT_KEY.format(worker=worker_name), 1,
+            ex=settings.AFFINITY_HEARTBEAT_SECONDS * 3
+        )
+    except Exception as e:
+        logger.warning(f"Affinity heartbeat failed for {worker_name}: {str(e)}")
+
+    # One live worker per heartbeat period rescues tasks left on dead workers' queues
+    try:
+        if get_redis().set(SWEEP_KEY, worker_name, nx=True, ex=settings.AFFINITY_HEARTBEAT_SECONDS):
+            requeue_orphaned_tasks()
+    except Exception as e:
+        logger.warning(f"Sweep of dead workers' queues failed: {str(e)}")
+
+    timer = threading.Timer(settings.AFFINITY_HEARTBEAT_SECONDS, _heartbeat, args=(worker_name,))
+    timer.daemon = True
+    timer.start()
+
+
+def live_workers(pool: str) -> List[str]:
+    """Workers of a pool that are registered and still sending heartbeats"""
+    redis_client = get_redis()
+    names = sorted(redis_client.smembers(WORKERS_KEY.format(pool=pool)))
+    if not names:
+        return []
+    alive = redis_client.mget([HEARTBEAT_KEY.format(worker=name) for name in names])
+    return [name for name, beat in zip(names, alive) if beat]
+
+
+def ring_owner(shard: str, workers: List[str]) -> Optional[str]:
+    """Pick the worker owning a shard by consistent hashing"""
+    if not workers:
+        return None
+    ring = sorted(
+        (_hash(f"{worker}#{replica}"), worker)
+        for worker in workers
+        for replica in range(RING_REPLICAS)
+    )
+    index = bisect.bisect(ring, (_hash(shard), "")) % len(ring)
+    return ring[index][1]
+
+
+def advertise(shard: str, worker_name: str):
+    """Record that a worker now has a shard's assets in its local cache"""
+    try:
+        get_redis().set(HOLDER_KEY.format(shard=shard), worker_name, ex=settings.AFFINITY_HOLDER_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to advertise {shard} on {worker_name}: {str(e)}")
+
+
+def _is_busy(worker_name: str) -> bool:
+    redis_client = get_redis()
+    load = int(redis_client.get(LOAD_KEY.format(worker=worker_name)) or 0)
+    concurrency = int(redis_client.hget(CONCURRENCY_KEY, worker_name) or 1)
+    return load >= concurrency
+
+
+def choose_queue(shard: str, pool: str) -> str:
+    """
+    Pick the queue for a task working on a shard.
+
+    Prefers the worker of the pool that last advertised the shard, then the
+    shard's owner on the pool's consistent-hash ring. Busy or dead workers are
+    skipped, and the pool's shared queue is the fallback so load stays balanced.
+
+    Args:
+        shard: Shard the task works on (see project_shard / asset_shard)
+        pool: Queue of the worker pool that runs the task
+    """
+    if not settings.AFFINITY_ROUTING:
+        return pool
+
+    try:
+        workers = live_workers(pool)
+        candidates = []
+
+        holder = get_redis().get(HOLDER_KEY.format(shard=shard))
+        if holder in workers:
+            candidates.append(holder)
+
+        owner = ring_owner(shard, workers)
+        if owner and owner not in candidates:
+            candidates.append(owner)
+
+        for worker_name in candidates:
+            if not _is_busy(worker_name):
+                return worker_queue(worker_name)
+    except Exception as e:
+        logger.warning(f"Affinity routing unavailable, using shared queue: {str(e)}")
+
+    return pool
+
+
+def _priority_lists(queue: str) -> List[str]:
+    """Broker lists holding a queue's messages, one per priority level, in priority order"""
+    options = celery_app.conf.broker_transport_options
+    sep = options.get('sep', '\x06\x16')
+    return [queue if level == 0 else f"{queue}{sep}{level}" for level in options['priority_steps']]
+
+
+def _pool_of(task_name: str) -> str:
+    """Shared queue a task is routed to when affinity does not pick a worker"""
+    route = celery_app.conf.task_routes.get(task_name) or {}
+    return route.get('queue', settings.CELERY_DEFAULT_QUEUE)
+
+
+def _requeue_oldest(broker, source: str, level: int) -> bool:
+    """
+    Move the oldest message of a worker queue's list to its pool queue.
+
+    The message is rewritten to name the pool, since an unacked message is
+    restored to the routing key it was delivered from.
+
+    Returns:
+        False once the list is empty
+    """
+    with broker.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(source)
+                raw = pipe.lindex(source, -1)
+                if raw is None:
+                    return False
+                message = json.loads(raw)
+                pool = celery_app.amqp.queues[_pool_of(message.get('headers', {}).get('task'))]
+                delivery_info = message.setdefault('properties', {}).setdefault('delivery_info', {})
+                delivery_info['exchange'] = pool.exchange.name
+                delivery_info['routing_key'] = pool.routing_key
+
+                pipe.multi()
+                pipe.rpop(source)
+                pipe.lpush(_priority_lists(pool.name)[level], json.dumps(message))
+                pipe.execute()
+                return True
+            except WatchError:
+                # Consumed or extended meanwhile (e.g. the worker came back); look again
+                continue
+
+
+def requeue_orphaned_tasks() -> int:
+    """
+    Return tasks waiting on dead workers' queues to the shared pool queues.
+
+    A task routed to a worker's own queue is only ever consumed by that
+    worker. If it dies, or restarts under another name, the task would wait
+    there forever while its job shows as processing.
+
+    Returns:
+        Number of tasks moved
+    """
+    redis_client = get_redis()
+    pools = [settings.CELERY_DEFAULT_QUEUE, settings.ANALYSIS_QUEUE, settings.RENDER_QUEUE]
+    names = sorted(set().union(*(redis_client.smembers(WORKERS_KEY.format(pool=pool)) for pool in pools)))
+    if not names:
+        return 0
+    alive = redis_client.mget([HEARTBEAT_KEY.format(worker=name) for name in names])
+    dead = [name for name, beat in zip(names, alive) if not beat]
+
+    moved = 0
+    if dead:
+        with celery_app.connection_for_write() as connection:
+            broker = connection.default_channel.client
+            for worker_name in dead:
+                for level, source in enumerate(_priority_lists(worker_queue(worker_name))):
+                    while _requeue_oldest(broker, source, level):
+                        moved += 1
+                unregister_worker(worker_name, pools)
+                logger.info(f"Removed dead worker {worker_name} from affinity routing")
+
+    if moved:
+        logger.warning(f"Moved {moved} tasks from dead workers' queues back to the shared queues")
+    return moved
+
+
+def track_task(worker_name: str, delta: int):
+    """Adjust a worker's in-flight task count"""
+    if not worker_name:
+        return
+    try:
+        key = LOAD_KEY.format(worker=worker_name)
+        redis_client = get_redis()
+        if redis_client.incrby(key, delta) < 0:
+            redis_client.set(key, 0)
+    except Exception as e:
+        logger.warning(f"Failed to track load of {worker_name}: {str(e)}")
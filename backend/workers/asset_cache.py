@@ -0,0 +1,225 @@
+"""Worker-local content-addressable asset cache with size-bounded LRU eviction"""
+import os
+import time
+import uuid
+import fcntl
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from workers.transfer import download_asset
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    storage_key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    pid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_key ON leases (key);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AssetCache:
+    """
+    Disk cache of S3 objects shared by all worker processes on a host.
+
+    Entries are keyed by storage key plus ETag, so a re-uploaded object never
+    serves stale bytes. Files are hard-linked into job directories (copied when
+    the job directory is on another filesystem). Each checkout takes a lease;
+    leased entries are never evicted, and leases of dead processes are purged
+    before eviction so a crashed job cannot pin the cache forever.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or settings.ASSET_CACHE_DIR
+        self.max_bytes = max_bytes or settings.ASSET_CACHE_MAX_BYTES
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.locks_dir = os.path.join(self.root, "locks")
+        self.index_path = os.path.join(self.root, "index.sqlite")
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.locks_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def fetch(
+        self,
+        s3_client,
+        storage_key: str,
+        dest_path: str,
+        owner: str,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> bool:
+        """
+        Make an S3 object available at dest_path, downloading it only on a miss.
+
+        Args:
+            s3_client: boto3 S3 client
+            storage_key: Object key in the bucket
+            dest_path: Where the job expects the file
+            owner: Lease owner (e.g. "job_12"), released with release(owner)
+            progress: Called with the fraction of bytes received on a miss
+
+        Returns:
+            True on a cache hit, False if the object was downloaded
+        """
+        head = s3_client.head_object(Bucket=settings.S3_BUCKET, Key=storage_key)
+        etag = head['ETag'].strip('"')
+        key = hashlib.sha256(f"{storage_key}\0{etag}".encode()).hexdigest()
+        object_path = os.path.join(self.objects_dir, key[:2], key)
+
+        with self._key_lock(key):
+            with self._transaction() as conn:
+                conn.execute("INSERT INTO leases (key, owner, pid) VALUES (?, ?, ?)", (key, owner, os.getpid()))
+                hit = conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+                if hit and os.path.exists(object_path):
+                    conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                else:
+                    hit = False
+
+            if not hit:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                part_path = f"{object_path}.{uuid.uuid4().hex}.part"
+                try:
+                    download_asset(s3_client, storage_key, part_path, progress=progress, total_bytes=head['ContentLength'])
+                    os.replace(part_path, object_path)
+                finally:
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+
+                with self._transaction() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, storage_key, size, last_access) VALUES (?, ?, ?, ?)",
+                        (key, storage_key, os.path.getsize(object_path), time.time())
+                    )
+                    self._evict(conn)
+
+        self._link(object_path, dest_path)
+        logger.info(f"Asset cache {'hit' if hit else 'miss'} for {storage_key}")
+        return hit
+
+    def fetch_many(self, s3_client, items: List[Tuple[str, str]], owner: str) -> Dict:
+        """
+        Fetch several objects concurrently through the cache.
+
+        Args:
+            items: List of (storage_key, dest_path) pairs
+            owner: Lease owner for all items
+
+        Returns:
+            Dict with hit and miss counts
+        """
+        if not items:
+            return {"hits": 0, "misses": 0}
+
+        workers = min(settings.S3_DOWNLOAD_WORKERS, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-cache") as pool:
+            hits = list(pool.map(lambda item: self.fetch(s3_client, item[0], item[1], owner), items))
+
+        return {"hits": sum(hits), "misses": len(hits) - sum(hits)}
+
+    def release(self, owner: str):
+        """Drop all leases held by owner, making its entries evictable again"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE owner = ?", (owner,))
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Remove least recently used, unleased entries until under the size limit"""
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM leases").fetchall():
+            if not _pid_alive(pid):
+                conn.execute("DELETE FROM leases WHERE pid = ?", (pid,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        candidates = conn.execute(
+            "SELECT key, size FROM entries WHERE key NOT IN (SELECT key FROM leases) ORDER BY last_access"
+        ).fetchall()
+        for key, size in candidates:
+            if total <= self.max_bytes:
+                break
+            object_path = os.path.join(self.objects_dir, key[:2], key)
+            if os.path.exists(object_path):
+                os.remove(object_path)
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            logger.info(f"Evicted {key} from asset cache ({size} bytes)")
+
+    @staticmethod
+    def _link(object_path: str, dest_path: str):
+        """Hard-link a cached object into a job directory, copying across filesystems"""
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(object_path, dest_path)
+        except OSError:
+            shutil.copyfile(object_path, dest_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self):
+        """Serialized write transaction across worker processes"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        """Ensure only one process downloads a given object at a time"""
+        with open(os.path.join(self.locks_dir, f"{key}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_asset_cache = None
+_asset_cache_lock = threading.Lock()
+
+
+def get_asset_cache() -> AssetCache:
+    """Get the process-wide asset cache"""
+    global _asset_cache
+    if _asset_cache is None:
+        with _asset_cache_lock:
+            if _asset_cache is None:
+                _asset_cache = AssetCache()
+    return _asset_cache
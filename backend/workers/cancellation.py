@@ -0,0 +1,73 @@
+"""Cooperative job cancellation"""
+import os
+import time
+import signal
+import logging
+from app.config import settings
+from app.redis_client import get_redis
+from workers.memory import descendant_pids
+
+logger = logging.getLogger(__name__)
+
+CANCEL_KEY = "job:{job_id}:cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised at a cancellation point of a job that was cancelled"""
+
+
+def request_cancel(job_id: int):
+    """Flag a job as cancelled; its tasks stop at their next cancellation point"""
+    get_redis().set(CANCEL_KEY.format(job_id=job_id), 1, ex=settings.SCHEDULER_JOB_TTL_SECONDS)
+
+
+def is_cancelled(job_id: int) -> bool:
+    try:
+        return bool(get_redis().exists(CANCEL_KEY.format(job_id=job_id)))
+    except Exception as e:
+        logger.warning(f"Failed to read cancellation flag of job {job_id}: {str(e)}")
+        return False
+
+
+class CancellationToken:
+    """
+    Cheap, frequently callable check of a job's cancellation flag.
+
+    Redis is consulted at most once per ``interval`` seconds, so the token can
+    be polled from per-frame progress callbacks.
+    """
+
+    def __init__(self, job_id: int, interval: float = 1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self.cancelled = False
+        self._last_check = 0.0
+
+    def __call__(self) -> bool:
+        now = time.monotonic()
+        if not self.cancelled and now - self._last_check >= self.interval:
+            self._last_check = now
+            self.cancelled = is_cancelled(self.job_id)
+        return self.cancelled
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled"""
+        if self():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+
+def kill_subprocesses():
+    """Kill everything this worker process started (ffmpeg readers and writers)"""
+    try:
+        pids = descendant_pids(os.getpid())
+    except OSError as e:
+        logger.warning(f"Failed to list subprocesses: {str(e)}")
+        return
+
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            continue
+    if pids:
+        logger.info(f"Killed {len(pids)} subprocesses of cancelled job")
@@ -1,11 +1,16 @@
 """Celery app configuration"""
 import logging
 from celery import Celery
-from celery.signals import worker_ready, worker_shutdown
+from kombu import Queue
+from celery.signals import worker_ready, worker_shutdown, worker_process_init, task_prerun, task_postrun
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Task priorities. With the Redis transport a lower number is served first.
+PRIORITY_PREVIEW = 0
+PRIORITY_FINAL = 5
+
 # Create Celery app
 celery_app = Celery(
     "ai_video_editor",
@@ -29,6 +34,29 @@ celery_app.conf.update(
     broker_connection_retry_on_startup=True,
     broker_connection_retry=True,
     broker_connection_max_retries=10,
+    task_default_queue=settings.CELERY_DEFAULT_QUEUE,
+    # One queue per kind of work, so a burst of renders cannot starve analysis
+    # or the short orchestration tasks. Anything unlisted is a light task.
+    # Workers started without -Q consume all three.
+    task_queues=(
+        Queue(settings.CELERY_DEFAULT_QUEUE),
+        Queue(settings.ANALYSIS_QUEUE),
+        Queue(settings.RENDER_QUEUE),
+    ),
+    task_routes={
+        'analyze_asset': {'queue': settings.ANALYSIS_QUEUE},
+        'render_edit': {'queue': settings.RENDER_QUEUE},
+    },
+    task_default_priority=PRIORITY_FINAL,
+    broker_transport_options={
+        # Longer than any attempt can run (hard limit plus a memory hold-back),
+        # so an unacked task is only redelivered once its worker is gone.
+        # Duplicates that still slip through are stopped by job leases.
+        'visibility_timeout': 2 * 3600,
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
     result_expires=3600,  # Results expire after 1 hour
     result_backend_transport_options={
         'master_name': 'mymaster',
@@ -37,13 +65,56 @@ celery_app.conf.update(
     }
 )
 
+
+def consumed_pools() -> list:
+    """Pool queues this worker consumes (selected with ``-Q``)"""
+    pools = {settings.CELERY_DEFAULT_QUEUE, settings.ANALYSIS_QUEUE, settings.RENDER_QUEUE}
+    return [name for name in celery_app.amqp.queues.consume_from if name in pools]
+
 # Signal handlers
 @worker_ready.connect
 def worker_init(sender, **kwargs):
     """Initialize worker"""
-    logger.info("Celery worker is ready")
+    logger.info(f"Celery worker is ready (pools: {consumed_pools()})")
+
+    if settings.AFFINITY_ROUTING:
+        from workers.affinity import register_worker, worker_queue
+        try:
+            pools = consumed_pools()
+            # Consume a dedicated queue so affinity-routed tasks land here
+            sender.add_task_queue(worker_queue(sender.hostname))
+            register_worker(sender.hostname, sender.controller.concurrency, pools)
+        except Exception as e:
+            logger.warning(f"Affinity routing disabled for this worker: {e}")
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Preload the detection model in analysis pool processes"""
+    if settings.ANALYSIS_QUEUE in consumed_pools():
+        from ai_engine.object_tagger import get_yolo_model
+        try:
+            get_yolo_model()
+        except Exception as e:
+            logger.warning(f"Failed to preload YOLO model: {e}")
 
 @worker_shutdown.connect
 def worker_shutdown_handler(sender, **kwargs):
     """Shutdown handler"""
     logger.info("Celery worker is shutting down")
+
+    if settings.AFFINITY_ROUTING:
+        from workers.affinity import retire_worker
+        retire_worker(sender.hostname)
+
+@task_prerun.connect
+def task_started_handler(task=None, **kwargs):
+    """Count in-flight tasks so busy workers are skipped by affinity routing"""
+    if settings.AFFINITY_ROUTING and task is not None:
+        from workers.affinity import track_task
+        track_task(task.request.hostname, 1)
+
+@task_postrun.connect
+def task_finished_handler(task=None, **kwargs):
+    if settings.AFFINITY_ROUTING and task is not None:
+        from workers.affinity import track_task
+        track_task(task.request.hostname, -1)
@@ -0,0 +1,111 @@
+"""Per-job checkpoints so retried jobs resume instead of starting over"""
+import os
+import json
+import shutil
+import logging
+from typing import Any, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobCheckpoint:
+    """
+    Durable work area and stage manifest for a single edit job.
+
+    The work directory path is derived from the job ID only, so a retried or
+    redelivered task finds the files of the previous attempt. The manifest is
+    written locally and mirrored to S3; when a retry lands on another worker,
+    the S3 copy still lets it skip analysis and selection. Stages that need no
+    files (e.g. selection) can use ``local=False`` to work on the S3 copy only.
+    """
+
+    def __init__(self, s3_client, project_id: int, job_id: int, local: bool = True):
+        self.s3_client = s3_client
+        self.project_id = project_id
+        self.job_id = job_id
+        self.work_dir = os.path.join(settings.JOB_WORK_DIR, f"job_{job_id}")
+        self.segment_dir = os.path.join(self.work_dir, "segments")
+        self.manifest_path = os.path.join(self.work_dir, "manifest.json")
+        self.manifest_key = f"projects/{project_id}/jobs/{job_id}/manifest.json"
+        self.local = local
+
+        if local:
+            os.makedirs(self.segment_dir, exist_ok=True)
+        self.manifest = self._load()
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        """Get the stored output of a stage"""
+        return self.manifest["stages"].get(stage, default)
+
+    def save(self, stage: str, data: Any):
+        """Record the output of a stage and persist the manifest"""
+        self.manifest["stages"][stage] = data
+        self._persist()
+
+    def mark_segment(self, segment_path: str):
+        """Record a rendered timeline segment"""
+        name = os.path.basename(segment_path)
+        if name not in self.manifest["segments"]:
+            self.manifest["segments"].append(name)
+            self._persist()
+
+    def local_path(self, filename: str) -> str:
+        """Get a path inside the job's work directory"""
+        return os.path.join(self.work_dir, filename)
+
+    def clear(self):
+        """Remove the work directory and the S3 manifest"""
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            logger.info(f"Cleaned up work directory {self.work_dir}")
+        try:
+            self.s3_client.delete_object(Bucket=settings.S3_BUCKET, Key=self.manifest_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete job manifest: {str(e)}")
+
+    def _load(self) -> dict:
+        """Load the manifest from local disk, falling back to S3"""
+        manifest = self._read_local() or self._read_remote()
+        if manifest:
+            logger.info(
+                f"Resuming job {self.job_id} from checkpoint "
+                f"(stages: {list(manifest['stages'])}, segments: {len(manifest['segments'])})"
+            )
+            return manifest
+        return {"project_id": self.project_id, "job_id": self.job_id, "stages": {}, "segments": []}
+
+    def _read_local(self) -> Optional[dict]:
+        if not self.local:
+            return None
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _read_remote(self) -> Optional[dict]:
+        try:
+            response = self.s3_client.get_object(Bucket=settings.S3_BUCKET, Key=self.manifest_key)
+            return json.loads(response["Body"].read())
+        except Exception:
+            return None
+
+    def _persist(self):
+        """Write the manifest atomically to disk, then mirror it to S3"""
+        body = json.dumps(self.manifest)
+        if self.local:
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(body)
+            os.replace(tmp_path, self.manifest_path)
+
+        try:
+            self.s3_client.put_object(
+                Bucket=settings.S3_BUCKET,
+                Key=self.manifest_key,
+                Body=body.encode(),
+                ContentType="application/json"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to mirror job manifest to S3: {str(e)}")
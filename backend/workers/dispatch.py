@@ -0,0 +1,68 @@
+"""Job dispatch and cancellation, importable without the AI engine"""
+import logging
+from typing import List
+from celery.result import AsyncResult
+from workers.celery_app import celery_app, PRIORITY_FINAL, PRIORITY_PREVIEW
+from workers import scheduler
+from workers.cancellation import request_cancel
+
+logger = logging.getLogger(__name__)
+
+
+def start_job(project_id: int, job_id: int, preview: bool = False) -> AsyncResult:
+    """
+    Queue a job's orchestration task.
+
+    Tasks are sent by name, so the API process never imports workers.tasks
+    (and with it MoviePy, OpenCV and the detection model).
+
+    Args:
+        project_id: ID of the project
+        job_id: ID of the job
+        preview: Schedule every stage ahead of final renders
+
+    Returns:
+        The queued task
+    """
+    # Orchestration is a light task; the stages it dispatches pick their pools
+    return celery_app.send_task(
+        'process_edit_job',
+        kwargs={"project_id": project_id, "job_id": job_id, "preview": preview},
+        priority=PRIORITY_PREVIEW if preview else PRIORITY_FINAL
+    )
+
+
+def parse_prompt(project_id: int):
+    """Queue parsing of a project's prompt"""
+    celery_app.send_task('parse_project_prompt', args=[project_id])
+
+
+def dispatch_ready() -> List[int]:
+    """
+    Start every queued job the fair-share scheduler lets through.
+
+    Returns:
+        IDs of the dispatched jobs
+    """
+    dispatched = []
+    for entry in scheduler.pop_ready():
+        start_job(entry["project_id"], entry["job_id"], entry["preview"])
+        dispatched.append(entry["job_id"])
+        logger.info(f"Dispatched queued job {entry['job_id']} of user {entry['user_id']}")
+    return dispatched
+
+
+def stop_job(job_id: int, task_id: str = None):
+    """Flag a job as cancelled and drop its orchestration task if still queued"""
+    request_cancel(job_id)
+    if task_id:
+        celery_app.control.revoke(task_id)
+
+
+def release_slot(job_id: int):
+    """Give a finished job's scheduler slot to the next queued job"""
+    try:
+        scheduler.release(job_id)
+        dispatch_ready()
+    except Exception as e:
+        logger.warning(f"Failed to release scheduler slot of job {job_id}: {str(e)}")
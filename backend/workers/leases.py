@@ -0,0 +1,117 @@
+"""Self-renewing Redis leases so redelivered tasks never duplicate running work"""
+import uuid
+import socket
+import logging
+import threading
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY = "lease:{name}"
+DELIVERY_KEY = "deliveries:{task_id}:{attempt}"
+
+# Only the current holder may renew or release a lease
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Lease:
+    """
+    Exclusive claim on a unit of work, kept alive by a heartbeat thread.
+
+    The holder renews the lease every third of its TTL. If the holder dies,
+    renewals stop and the lease lapses after ``ttl`` seconds, so the next
+    attempt (e.g. a redelivered acks_late task) takes over cleanly.
+    """
+
+    def __init__(self, name: str, ttl: int = None):
+        self.key = LEASE_KEY.format(name=name)
+        self.ttl = ttl or settings.LEASE_TTL_SECONDS
+        self.token = f"{socket.gethostname()}:{uuid.uuid4().hex}"
+        self.held = False
+        self.lost = False
+        self._stop_event = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """
+        Take the lease if nobody holds a live one.
+
+        Returns:
+            True if this process now holds the lease
+        """
+        try:
+            self.held = bool(get_redis().set(self.key, self.token, nx=True, px=self.ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Lease store unavailable, proceeding without {self.key}: {str(e)}")
+            return True
+
+        if self.held:
+            self._heartbeat = threading.Thread(target=self._renew_loop, daemon=True, name=f"lease-{self.key}")
+            self._heartbeat.start()
+        return self.held
+
+    def remaining(self) -> int:
+        """Seconds until the current holder's lease lapses if it stops renewing"""
+        try:
+            return max(1, int(get_redis().pttl(self.key) / 1000) + 1)
+        except Exception:
+            return self.ttl
+
+    def release(self):
+        """Stop renewing and give the lease up"""
+        if not self.held:
+            return
+        self._stop_event.set()
+        self.held = False
+        try:
+            get_redis().eval(_RELEASE, 1, self.key, self.token)
+        except Exception as e:
+            logger.warning(f"Failed to release {self.key}: {str(e)}")
+
+    def _renew_loop(self):
+        while not self._stop_event.wait(self.ttl / 3):
+            try:
+                if not get_redis().eval(_RENEW, 1, self.key, self.token, self.ttl * 1000):
+                    self.lost = True
+                    logger.warning(f"Lost {self.key}; another worker may take the work over")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to renew {self.key}: {str(e)}")
+
+
+def count_delivery(task_id: str, attempt: int) -> int:
+    """
+    Count a delivery of one attempt of a task.
+
+    acks_late tasks are delivered again when their worker dies, so a count
+    above one means earlier deliveries never finished.
+
+    Args:
+        task_id: Celery task ID
+        attempt: Retry number of the attempt (request.retries)
+
+    Returns:
+        Deliveries so far, this one included (1 if Redis is unavailable)
+    """
+    key = DELIVERY_KEY.format(task_id=task_id, attempt=attempt)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 24 * 3600)
+        return pipe.execute()[0]
+    except Exception as e:
+        logger.warning(f"Failed to count delivery of task {task_id}: {str(e)}")
+        return 1
@@ -0,0 +1,270 @@
+"""Memory-aware admission so concurrent renders and analyses do not get OOM-killed"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+import subprocess
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RESERVATIONS_KEY = "memory:{host}"  # hash: task id -> "bytes:expires_at"
+SAMPLES_KEY = "memory:samples:{kind}"  # list of peak / estimate ratios
+MAX_SAMPLES = 50
+MIN_SAMPLES = 5
+
+MB = 1024 * 1024
+
+# Fixed cost of a task process (interpreter, MoviePy / torch + YOLO weights)
+BASE_BYTES = {"render": 400 * MB, "analysis": 700 * MB}
+# Frames held per open source: MoviePy reader buffer plus the ffmpeg decoder
+READER_FRAMES = 10
+# Frames held by the x264 encoder (lookahead, reference frames)
+ENCODER_FRAMES = 60
+# Float working copies made by filters, blends and overlays
+WORKING_FRAMES = 8
+# Assumed when a source cannot be probed; better to overestimate
+UNKNOWN_DIMENSIONS = (3840, 2160)
+
+# Reserve unless the host's other reservations plus this one exceed the
+# budget. A host with nothing reserved always admits, so an oversized job
+# still runs on its own instead of waiting forever.
+_RESERVE = """
+local now, requested, budget = tonumber(ARGV[3]), tonumber(ARGV[2]), tonumber(ARGV[5])
+local total, others = 0, 0
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local bytes, expires = string.match(entries[i + 1], '(%d+):(%d+)')
+    if tonumber(expires) < now then
+        redis.call('HDEL', KEYS[1], entries[i])
+    elseif entries[i] ~= ARGV[1] then
+        total = total + tonumber(bytes)
+        others = others + 1
+    end
+end
+if others > 0 and total + requested > budget then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], string.format('%d:%d', requested, now + tonumber(ARGV[4])))
+return 1
+"""
+
+
+def _frame_bytes(width: int, height: int) -> int:
+    return width * height * 3
+
+
+def estimate_render(sources: List[Tuple[int, int]], transitions: bool, filtered: bool) -> int:
+    """
+    Estimate the peak RSS of a render.
+
+    Args:
+        sources: (width, height) of every clip on the timeline
+        transitions: Whether cuts are blended (adds one extra piece per cut)
+        filtered: Whether a per-frame filter is applied
+
+    Returns:
+        Estimated peak in bytes, before calibration
+    """
+    output_frame = _frame_bytes(settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+    pieces = len(sources) * 2 - 1 if transitions and sources else len(sources)
+
+    estimate = BASE_BYTES["render"]
+    estimate += sum(READER_FRAMES * _frame_bytes(w, h) for w, h in sources)
+    # Encoded segments are read back at output resolution for the final pass
+    estimate += pieces * READER_FRAMES * output_frame
+    estimate += ENCODER_FRAMES * output_frame
+    if filtered or transitions:
+        estimate += WORKING_FRAMES * output_frame * 8  # float64 copies
+    return estimate
+
+
+def estimate_analysis(width: int, height: int) -> int:
+    """Estimate the peak RSS of scene detection plus object tagging of one video"""
+    return BASE_BYTES["analysis"] + (READER_FRAMES + WORKING_FRAMES) * _frame_bytes(width, height)
+
+
+def calibrated(kind: str, estimate: int) -> int:
+    """
+    Scale an estimate by how far recent estimates of this kind were off.
+
+    Uses the 90th percentile of recorded peak / estimate ratios, so the
+    estimator errs on the safe side.
+    """
+    try:
+        ratios = sorted(float(r) for r in get_redis().lrange(SAMPLES_KEY.format(kind=kind), 0, -1))
+    except Exception as e:
+        logger.warning(f"Failed to read memory samples: {str(e)}")
+        return estimate
+
+    if len(ratios) < MIN_SAMPLES:
+        return estimate
+    ratio = ratios[min(len(ratios) - 1, int(len(ratios) * 0.9))]
+    return int(estimate * min(max(ratio, 0.5), 3.0))
+
+
+def record_peak(kind: str, estimate: int, peak: int):
+    """Store the measured peak of a task to calibrate later estimates"""
+    if not estimate or not peak:
+        return
+    logger.info(f"{kind} peak RSS {peak // MB} MB (estimated {estimate // MB} MB)")
+    try:
+        key = SAMPLES_KEY.format(kind=kind)
+        pipe = get_redis().pipeline()
+        pipe.lpush(key, round(peak / estimate, 3))
+        pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record memory sample: {str(e)}")
+
+
+def host_budget() -> int:
+    """Bytes that tasks on this host may reserve"""
+    if settings.WORKER_MEMORY_BUDGET_MB:
+        return settings.WORKER_MEMORY_BUDGET_MB * MB
+    return int(_memory_limit() * settings.WORKER_MEMORY_HEADROOM)
+
+
+def _memory_limit() -> int:
+    """Container memory limit (cgroup v2 or v1), else physical memory"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value.isdigit() and int(value) < 1 << 60:
+                return int(value)
+        except OSError:
+            continue
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def reserve(token: str, size: int, ttl: int) -> bool:
+    """
+    Reserve memory on this host for a task.
+
+    Args:
+        token: Unique reservation ID (the Celery task ID)
+        size: Bytes to reserve
+        ttl: Seconds after which a reservation of a crashed task lapses
+
+    Returns:
+        True if the task may start now
+    """
+    try:
+        admitted = get_redis().eval(
+            _RESERVE, 1, RESERVATIONS_KEY.format(host=socket.gethostname()),
+            token, int(size), int(time.time()), ttl, host_budget()
+        )
+        return bool(admitted)
+    except Exception as e:
+        logger.warning(f"Memory admission unavailable, admitting {token}: {str(e)}")
+        return True
+
+
+def release(token: str):
+    """Return a task's reservation"""
+    try:
+        get_redis().hdel(RESERVATIONS_KEY.format(host=socket.gethostname()), token)
+    except Exception as e:
+        logger.warning(f"Failed to release memory reservation {token}: {str(e)}")
+
+
+def probe_dimensions(source: str) -> Optional[Tuple[int, int]]:
+    """
+    Read the frame size of a video or image with ffprobe.
+
+    Args:
+        source: Local path or URL; only the header is read
+
+    Returns:
+        (width, height), or None if the source cannot be probed
+    """
+    try:
+        output = subprocess.run(
+            [
+                settings.FFPROBE_BINARY, '-v', 'error', '-select_streams', 'v:0',
+                '-show_entries', 'stream=width,height', '-of', 'json', source
+            ],
+            capture_output=True, check=True, timeout=30
+        ).stdout
+        stream = json.loads(output)["streams"][0]
+        return int(stream["width"]), int(stream["height"])
+    except Exception as e:
+        logger.warning(f"Failed to probe {source.split('?')[0]}: {str(e)}")
+        return None
+
+
+def _process_table() -> Dict[int, Tuple[int, int]]:
+    """Map every visible pid to (parent pid, resident pages)"""
+    table = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields follow the last ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        table[int(entry)] = (int(fields[1]), int(fields[21]))
+    return table
+
+
+def descendant_pids(root_pid: int, table: Optional[Dict[int, Tuple[int, int]]] = None) -> Set[int]:
+    """All processes started by root_pid, directly or not (e.g. ffmpeg)"""
+    table = table if table is not None else _process_table()
+    tree = {root_pid}
+    grown = True
+    while grown:
+        children = {pid for pid, (ppid, _) in table.items() if ppid in tree} - tree
+        tree |= children
+        grown = bool(children)
+    return tree - {root_pid}
+
+
+def _process_tree_rss(root_pid: int) -> int:
+    """Resident memory of a process and all its descendants"""
+    table = _process_table()
+    tree = descendant_pids(root_pid, table) | {root_pid}
+    return sum(table[pid][1] for pid in tree if pid in table) * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakRSSMonitor(threading.Thread):
+    """Sample the RSS of the current process tree and keep the maximum"""
+
+    def __init__(self, interval: float = 0.5):
+        super().__init__(daemon=True, name="rss-monitor")
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        pid = os.getpid()
+        while True:
+            try:
+                self.peak = max(self.peak, _process_tree_rss(pid))
+            except Exception as e:
+                logger.warning(f"RSS sampling failed: {str(e)}")
+                return
+            if self._stop_event.wait(self.interval):
+                return
+
+    def stop(self) -> int:
+        """Stop sampling and return the peak in bytes"""
+        self._stop_event.set()
+        self.join()
+        return self.peak
@@ -0,0 +1,181 @@
+"""Job progress reporting with cheap Redis updates and throttled DB writes"""
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from sqlalchemy import or_, update
+from app.config import settings
+from app.models import Job
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Share of the overall progress bar taken by each pipeline stage
+STAGE_WEIGHTS = {
+    "download": 0.15,
+    "analysis": 0.35,
+    "selection": 0.05,
+    "render": 0.40,
+    "upload": 0.05,
+}
+
+PROGRESS_KEY = "job:{job_id}:progress"
+
+# Several tasks of one job report concurrently; only ever move the value forward
+_PUBLISH_IF_AHEAD = """
+local current = redis.call('GET', KEYS[1])
+if current and cjson.decode(current)['progress'] >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+def progress_key(job_id: int) -> str:
+    return PROGRESS_KEY.format(job_id=job_id)
+
+
+def get_live_progress(job_id: int) -> Optional[Dict]:
+    """
+    Read the latest progress published by a worker.
+
+    Returns:
+        Dict with 'progress' (0-100), 'stage' and 'eta_seconds', or None
+    """
+    try:
+        raw = get_redis().get(progress_key(job_id))
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"Failed to read live progress for job {job_id}: {str(e)}")
+        return None
+
+
+class ProgressReporter:
+    """
+    Turn per-stage fractions into an overall job percentage.
+
+    Every update goes to Redis (itself throttled to small steps), which is what
+    the job status endpoint reads. The ``jobs.progress`` column is only written
+    every PROGRESS_DB_FLUSH_SECONDS so per-frame callbacks never hit Postgres.
+    Parallel tasks of the same job can each hold a reporter; both stores only
+    accept values ahead of what is already recorded.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        session_factory,
+        stages: Dict[str, float] = None,
+        started_at: Optional[datetime] = None
+    ):
+        self.job_id = job_id
+        self.session_factory = session_factory
+        self.stages = stages or STAGE_WEIGHTS
+        self.started_at = started_at or datetime.utcnow()
+        self.progress = 0.0
+        self.stage = None
+        self._last_publish = 0.0
+        self._last_flush = 0.0
+        self._published_progress = -1.0
+
+    def update(self, stage: str, fraction: float):
+        """Report that a stage is ``fraction`` (0-1) complete"""
+        fraction = min(max(fraction, 0.0), 1.0)
+        done = 0.0
+        for name, weight in self.stages.items():
+            if name == stage:
+                break
+            done += weight
+        progress = 100.0 * (done + self.stages.get(stage, 0.0) * fraction)
+
+        # Never move backwards (e.g. a stage resumed from a checkpoint)
+        self.progress = max(self.progress, progress)
+        self.stage = stage
+        self._publish(force=fraction >= 1.0)
+
+    def callback(self, stage: str) -> Callable[[float], None]:
+        """Get a fraction callback bound to one stage, for ai_engine hooks"""
+        return lambda fraction: self.update(stage, fraction)
+
+    def unit_callback(self, stage: str, total: int) -> Callable[[float], None]:
+        """
+        Get a fraction callback for one unit of a stage split across ``total``
+        parallel tasks. Its fraction is counted on top of the units already
+        finished, and advance() counts the unit once it is done.
+        """
+        try:
+            done = int(get_redis().get(self._units_key(stage)) or 0)
+        except Exception as e:
+            logger.warning(f"Failed to read progress for job {self.job_id}: {str(e)}")
+            done = 0
+        return lambda fraction: self.update(stage, (done + fraction) / max(total, 1))
+
+    def advance(self, stage: str, total: int):
+        """Count one finished unit of a stage that is split across parallel tasks"""
+        key = self._units_key(stage)
+        try:
+            redis_client = get_redis()
+            done = redis_client.incr(key)
+            redis_client.expire(key, settings.PROGRESS_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Failed to count progress for job {self.job_id}: {str(e)}")
+            return
+        self.update(stage, done / max(total, 1))
+
+    def complete(self, stage: str):
+        """Mark a stage as finished and flush immediately"""
+        self.update(stage, 1.0)
+        self.flush()
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimate remaining time from the rate observed so far"""
+        if self.progress < 2.0:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return round(elapsed * (100.0 - self.progress) / self.progress, 1)
+
+    def flush(self):
+        """Write the current progress to the jobs table"""
+        self._last_flush = time.monotonic()
+        try:
+            with self.session_factory() as db:
+                db.execute(
+                    update(Job)
+                    .where(Job.id == self.job_id)
+                    .where(or_(Job.progress.is_(None), Job.progress < self.progress))
+                    .values(progress=round(self.progress, 1))
+                )
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to flush progress for job {self.job_id}: {str(e)}")
+
+    def _units_key(self, stage: str) -> str:
+        return f"{progress_key(self.job_id)}:{stage}"
+
+    def _publish(self, force: bool = False):
+        now = time.monotonic()
+        if (
+            force
+            or self.progress - self._published_progress >= settings.PROGRESS_MIN_STEP
+            or now - self._last_publish >= 1.0
+        ):
+            self._last_publish = now
+            self._published_progress = self.progress
+            try:
+                get_redis().eval(
+                    _PUBLISH_IF_AHEAD, 1, progress_key(self.job_id),
+                    json.dumps({
+                        "progress": round(self.progress, 1),
+                        "stage": self.stage,
+                        "eta_seconds": self.eta_seconds()
+                    }),
+                    self.progress,
+                    settings.PROGRESS_TTL_SECONDS
+                )
+            except Exception as e:
+                logger.warning(f"Failed to publish progress for job {self.job_id}: {str(e)}")
+
+        if now - self._last_flush >= settings.PROGRESS_DB_FLUSH_SECONDS:
+            self.flush()
@@ -0,0 +1,186 @@
+"""Per-user fair-share scheduling and admission control for edit jobs"""
+import json
+import time
+import logging
+from typing import Dict, List, Optional
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sched:"
+RING_KEY = KEY_PREFIX + "ring"  # list: users with queued jobs, in round-robin order
+JOBS_KEY = KEY_PREFIX + "jobs"  # hash: job id -> payload, for queued and running jobs
+RUNNING_KEY = KEY_PREFIX + "running"  # zset: job id -> start time
+USER_QUEUE_KEY = KEY_PREFIX + "queue:{user_id}"  # list of queued job ids
+USER_RUNNING_KEY = KEY_PREFIX + "running:{user_id}"  # zset: job id -> start time
+
+# Admit a job unless the user's or the system's queue is full.
+# Returns 0 when queued, -1 when the user's queue is full, -2 when the system is.
+_SUBMIT = """
+if redis.call('LLEN', KEYS[3]) >= tonumber(ARGV[3]) then
+    return -1
+end
+if redis.call('HLEN', KEYS[2]) - redis.call('ZCARD', KEYS[4]) >= tonumber(ARGV[4]) then
+    return -2
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('RPUSH', KEYS[3], ARGV[1])
+if not redis.call('LPOS', KEYS[1], ARGV[5]) then
+    redis.call('RPUSH', KEYS[1], ARGV[5])
+end
+return 0
+"""
+
+# Start queued jobs round-robin across users while slots are free. Users at
+# their quota keep their place in the ring; slots of jobs that never released
+# them (crashed workers) expire after SCHEDULER_JOB_TTL_SECONDS. Expired jobs
+# also leave the jobs hash, or _SUBMIT would count them as queued forever.
+_POP_READY = """
+local now, stale = tonumber(ARGV[1]), tonumber(ARGV[2])
+local max_running, per_user, prefix = tonumber(ARGV[3]), tonumber(ARGV[4]), ARGV[5]
+for _, job in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', stale)) do
+    redis.call('HDEL', KEYS[3], job)
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', stale)
+
+local started = {}
+local users = redis.call('LLEN', KEYS[1])
+local blocked = 0
+while blocked < users and redis.call('ZCARD', KEYS[2]) < max_running do
+    local user = redis.call('LPOP', KEYS[1])
+    if not user then
+        break
+    end
+    local queue_key = prefix .. 'queue:' .. user
+    local running_key = prefix .. 'running:' .. user
+    redis.call('ZREMRANGEBYSCORE', running_key, '-inf', stale)
+
+    if redis.call('ZCARD', running_key) < per_user then
+        local job = redis.call('LPOP', queue_key)
+        if job then
+            redis.call('ZADD', running_key, now, job)
+            redis.call('ZADD', KEYS[2], now, job)
+            table.insert(started, job)
+            blocked = 0
+        end
+    else
+        blocked = blocked + 1
+    end
+
+    if redis.call('LLEN', queue_key) > 0 then
+        redis.call('RPUSH', KEYS[1], user)
+    else
+        users = users - 1
+    end
+end
+return started
+"""
+
+
+class SchedulerFull(Exception):
+    """Raised when a job cannot be admitted; retry after ``retry_after`` seconds"""
+
+    def __init__(self, message: str, retry_after: int = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def submit(user_id: int, project_id: int, job_id: int, preview: bool = False) -> int:
+    """
+    Queue a job for its user.
+
+    Args:
+        user_id: Owner of the project
+        project_id: ID of the project
+        job_id: ID of the job
+        preview: Passed on to process_edit_job
+
+    Returns:
+        Approximate position in the queue (1 = next to start)
+
+    Raises:
+        SchedulerFull: The user's or the system's queue is full
+    """
+    payload = json.dumps({"user_id": user_id, "project_id": project_id, "job_id": job_id, "preview": preview})
+    result = get_redis().eval(
+        _SUBMIT, 4,
+        RING_KEY, JOBS_KEY, USER_QUEUE_KEY.format(user_id=user_id), RUNNING_KEY,
+        job_id, payload, settings.MAX_QUEUED_JOBS_PER_USER, settings.MAX_QUEUED_JOBS, user_id
+    )
+
+    if result == -1:
+        raise SchedulerFull(f"You already have {settings.MAX_QUEUED_JOBS_PER_USER} jobs waiting")
+    if result == -2:
+        raise SchedulerFull("The editor is at capacity, please try again shortly", retry_after=60)
+
+    return queue_position(job_id) or 1
+
+
+def pop_ready() -> List[Dict]:
+    """
+    Claim the queued jobs that may start now.
+
+    Returns:
+        Payloads of the claimed jobs; the caller must dispatch them
+    """
+    now = time.time()
+    job_ids = get_redis().eval(
+        _POP_READY, 3,
+        RING_KEY, RUNNING_KEY, JOBS_KEY,
+        now, now - settings.SCHEDULER_JOB_TTL_SECONDS,
+        settings.MAX_RUNNING_JOBS, settings.MAX_RUNNING_JOBS_PER_USER, KEY_PREFIX
+    )
+    if not job_ids:
+        return []
+
+    payloads = get_redis().hmget(JOBS_KEY, job_ids)
+    return [json.loads(payload) for payload in payloads if payload]
+
+
+def release(job_id: int):
+    """Free the slot of a finished or failed job, or drop it from the queue"""
+    redis_client = get_redis()
+    payload = redis_client.hget(JOBS_KEY, job_id)
+    if not payload:
+        return
+
+    user_id = json.loads(payload)["user_id"]
+    pipe = redis_client.pipeline()
+    pipe.lrem(USER_QUEUE_KEY.format(user_id=user_id), 0, job_id)
+    pipe.zrem(USER_RUNNING_KEY.format(user_id=user_id), job_id)
+    pipe.zrem(RUNNING_KEY, job_id)
+    pipe.hdel(JOBS_KEY, job_id)
+    pipe.execute()
+
+
+def queue_position(job_id: int) -> Optional[int]:
+    """
+    Estimate how many jobs start before a queued job, itself included.
+
+    Dispatch is round-robin, so a job k-th in its user's queue waits for at
+    most k jobs of every other user.
+
+    Returns:
+        Position (1 = next to start), or None if the job is not queued
+    """
+    try:
+        redis_client = get_redis()
+        payload = redis_client.hget(JOBS_KEY, job_id)
+        if not payload:
+            return None
+
+        user_id = str(json.loads(payload)["user_id"])
+        index = redis_client.lpos(USER_QUEUE_KEY.format(user_id=user_id), job_id)
+        if index is None:
+            return None
+
+        rank = index + 1
+        pipe = redis_client.pipeline()
+        users = [user for user in redis_client.lrange(RING_KEY, 0, -1) if user != user_id]
+        for user in users:
+            pipe.llen(USER_QUEUE_KEY.format(user_id=user))
+        return rank + sum(min(length, rank) for length in pipe.execute())
+    except Exception as e:
+        logger.warning(f"Failed to read queue position of job {job_id}: {str(e)}")
+        return None
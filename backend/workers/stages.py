@@ -0,0 +1,46 @@
+"""Project-level stage graph for incremental re-edits"""
+import json
+import hashlib
+import logging
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+from app.models import StageResult
+
+logger = logging.getLogger(__name__)
+
+# Each stage output is stored with a hash of everything it was computed from:
+#   analysis  -> Asset.analysis_metadata, per asset (storage key)
+#   parse     -> prompt
+#   selection -> analysis results + selection fields of the parsed prompt
+#   render    -> timeline segments named by content (see ai_engine.renderer)
+# A change therefore only reruns the stages downstream of it.
+
+
+def input_hash(*inputs: Any) -> str:
+    """Hash the canonical JSON form of a stage's inputs"""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def load_stage(db: Session, project_id: int, stage: str, inputs_hash: str) -> Optional[Any]:
+    """
+    Get a stage's previous output if it was produced from the same inputs.
+
+    Returns:
+        The stored output, or None if the stage has to run
+    """
+    entry = db.query(StageResult).filter(
+        StageResult.project_id == project_id,
+        StageResult.stage == stage
+    ).first()
+
+    if entry and entry.input_hash == inputs_hash:
+        logger.info(f"Reusing {stage} stage of project {project_id}")
+        return entry.output
+    return None
+
+
+def save_stage(db: Session, project_id: int, stage: str, inputs_hash: str, output: Any):
+    """Record a stage's output together with the hash of its inputs"""
+    db.merge(StageResult(project_id=project_id, stage=stage, input_hash=inputs_hash, output=output))
+    db.commit()
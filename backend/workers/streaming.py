@@ -0,0 +1,105 @@
+"""Incremental upload of HLS output while a render is in progress"""
+import os
+import logging
+import threading
+from typing import Callable, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PLAYLIST_CONTENT_TYPE = 'application/vnd.apple.mpegurl'
+SEGMENT_CONTENT_TYPE = 'video/mp2t'
+
+
+class HLSUploader(threading.Thread):
+    """
+    Watch a local HLS directory and mirror it to S3 as segments are finished.
+
+    ffmpeg only lists a segment in the playlist once it has been closed, so the
+    playlist is the source of truth: every listed segment is uploaded before the
+    playlist itself, and players never see a reference to a missing object.
+    """
+
+    def __init__(
+        self,
+        s3_client,
+        stream_dir: str,
+        key_prefix: str,
+        playlist_name: str = 'index.m3u8',
+        poll_interval: float = 1.0,
+        on_first_segment: Optional[Callable[[str], None]] = None
+    ):
+        super().__init__(daemon=True, name=f"hls-uploader-{os.path.basename(stream_dir)}")
+        self.s3_client = s3_client
+        self.stream_dir = stream_dir
+        self.key_prefix = key_prefix.rstrip('/')
+        self.playlist_name = playlist_name
+        self.poll_interval = poll_interval
+        self.on_first_segment = on_first_segment
+        self.playlist_key = f"{self.key_prefix}/{playlist_name}"
+        self.uploaded = set()
+        self._stop_event = threading.Event()
+        self._last_playlist = None
+
+    def run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self._sync()
+
+    def stop(self):
+        """Stop polling, waiting out an upload in progress"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def finish(self):
+        """Stop polling and push whatever the encoder produced last"""
+        self.stop()
+        self._sync()
+
+    def _sync(self):
+        """Upload newly listed segments, then the updated playlist"""
+        playlist_path = os.path.join(self.stream_dir, self.playlist_name)
+        try:
+            with open(playlist_path) as f:
+                playlist = f.read()
+        except FileNotFoundError:
+            return
+
+        if playlist == self._last_playlist:
+            return
+
+        segments = [
+            line.strip() for line in playlist.splitlines()
+            if line.strip() and not line.startswith('#')
+        ]
+
+        try:
+            for segment in segments:
+                if segment in self.uploaded:
+                    continue
+                self.s3_client.upload_file(
+                    Filename=os.path.join(self.stream_dir, segment),
+                    Bucket=settings.S3_BUCKET,
+                    Key=f"{self.key_prefix}/{segment}",
+                    ExtraArgs={'ContentType': SEGMENT_CONTENT_TYPE}
+                )
+                self.uploaded.add(segment)
+
+            self.s3_client.put_object(
+                Bucket=settings.S3_BUCKET,
+                Key=self.playlist_key,
+                Body=playlist.encode(),
+                ContentType=PLAYLIST_CONTENT_TYPE,
+                CacheControl='no-cache'
+            )
+            self._last_playlist = playlist
+        except Exception as e:
+            logger.warning(f"Failed to publish HLS segments: {str(e)}")
+            return
+
+        if segments and self.on_first_segment:
+            callback, self.on_first_segment = self.on_first_segment, None
+            try:
+                callback(self.playlist_key)
+            except Exception as e:
+                logger.warning(f"Stream ready callback failed: {str(e)}")
@@ -6,8 +6,9 @@ import logging
 import uuid
 from datetime import datetime
 from pathlib import Path
-import boto3
-from botocore.config import Config
+from botocore.exceptions import ClientError
+from celery import chord, group
+from celery.exceptions import Ignore, Retry, SoftTimeLimitExceeded
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -17,13 +18,27 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.config import settings
 from app.database import Base
-from app.models import Project, Job, Asset
+from app.models import Project, Job, Asset, RenderOutput
+from app.storage import get_s3_client
 from ai_engine.scene_detector import detect_scenes
-from ai_engine.object_tagger import tag_video, tag_image
-from ai_engine.prompt_parser import parse_prompt_with_ollama
-from ai_engine.shot_selector import Scene, select_shots
-from ai_engine.renderer import render_video
-from workers.celery_app import celery_app
+from ai_engine.object_tagger import FrameTagger, tag_image
+from ai_engine.prompt_parser import PARSER_VERSION, parse_prompt_rule_based, parse_prompt_with_llm
+from ai_engine.shot_selector import SELECTOR_VERSION, Scene, select_shots
+from ai_engine.renderer import RenderCancelled, needs_final_pass, render_video
+from ai_engine.edl import build_edl, edl_hash
+from ai_engine.image_segments import evict_segment_cache
+from workers.celery_app import celery_app, PRIORITY_FINAL, PRIORITY_PREVIEW
+from workers.streaming import HLSUploader
+from workers import memory
+from workers.cancellation import CancellationToken, JobCancelled, kill_subprocesses, request_cancel
+from workers.dispatch import release_slot
+from workers.checkpoints import JobCheckpoint
+from workers.leases import Lease, count_delivery
+from workers.stages import input_hash, load_stage, save_stage
+from workers.progress import ProgressReporter
+from workers.transfer import download_asset, download_many, presigned_get_url, upload_to_s3
+from workers.asset_cache import get_asset_cache
+from workers.affinity import advertise, asset_shard, choose_queue, project_shard
 
 logger = logging.getLogger(__name__)
 
@@ -40,162 +55,635 @@ def get_db() -> Session:
         db.close()
 
 
-def get_s3_client():
-    """Get S3 client"""
-    s3_config = Config(
-        signature_version='s3v4',
-        retries={'max_attempts': 3}
-    )
-
-    return boto3.client(
-        's3',
-        endpoint_url=settings.S3_ENDPOINT_URL,
-        aws_access_key_id=settings.S3_ACCESS_KEY,
-        aws_secret_access_key=settings.S3_SECRET_KEY,
-        region_name=settings.S3_REGION,
-        use_ssl=settings.S3_USE_SSL,
-        config=s3_config
-    )
-
-
-def download_asset(s3_client, storage_key: str, local_path: str):
-    """Download asset from S3"""
-    try:
-        s3_client.download_file(
-            Bucket=settings.S3_BUCKET,
-            Key=storage_key,
-            Filename=local_path
-        )
-        logger.info(f"Downloaded {storage_key} to {local_path}")
-    except Exception as e:
-        raise Exception(f"Failed to download asset: {str(e)}")
-
-
-def upload_to_s3(s3_client, file_path: str, key: str):
-    """Upload file to S3"""
+def _publish_stream_key(job_id: int, stream_key: str):
+    """Expose the HLS playlist on the job as soon as its first segment is live"""
+    db = SessionLocal()
     try:
-        s3_client.upload_file(
-            Filename=file_path,
-            Bucket=settings.S3_BUCKET,
-            Key=key
-        )
-        logger.info(f"Uploaded {file_path} to {key}")
-    except Exception as e:
-        raise Exception(f"Failed to upload to S3: {str(e)}")
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job:
+            job.result = {**(job.result or {}), "stream_key": stream_key}
+            db.commit()
+            logger.info(f"Job {job_id} stream available at {stream_key}")
+    finally:
+        db.close()
 
 
 @celery_app.task(bind=True, name='process_edit_job')
-def process_edit_job(self, project_id: int, job_id: int):
+def process_edit_job(self, project_id: int, job_id: int, preview: bool = False):
     """
     Main task for processing video edit job.
 
+    Fans out one analysis task per asset across the analysis pool and joins
+    them in a chord whose callback parses the prompt, selects shots and hands
+    the plan to the render pool. Stages pass compact results (scene tables,
+    asset IDs), never files.
+
     Args:
         project_id: ID of the project
         job_id: ID of the job
+        preview: Schedule every stage ahead of final renders
     """
     db = SessionLocal()
-    temp_dir = None
+    lease = None
 
     try:
         logger.info(f"Starting edit job {job_id} for project {project_id}")
 
+        CancellationToken(job_id).check()
+
         # Get job and project from database
         job = db.query(Job).filter(Job.id == job_id).first()
         if not job:
             raise Exception(f"Job {job_id} not found")
 
+        # Only one execution dispatches the workflow. A redelivered copy waits
+        # while the holder is alive and takes over if it died before dispatching.
+        lease = Lease(f"job:{job_id}:dispatch")
+        if not lease.acquire():
+            logger.info(f"Job {job_id} is being dispatched elsewhere, checking back later")
+            raise self.retry(countdown=lease.remaining(), max_retries=self.request.retries + 1)
+
+        db.refresh(job)
+        if job.status in ("completed", "failed", "cancelled") or (job.result or {}).get("workflow_id"):
+            logger.info(f"Job {job_id} was already dispatched, skipping duplicate delivery")
+            return {"status": "duplicate"}
+
         project = db.query(Project).filter(Project.id == project_id).first()
         if not project:
             raise Exception(f"Project {project_id} not found")
 
+        asset_rows = db.query(Asset.id, Asset.storage_key).filter(Asset.project_id == project_id).all()
+        asset_ids = [asset_id for asset_id, _ in asset_rows]
+
+        if not asset_ids:
+            raise Exception("Project has no assets")
+
         # Update job status
         job.status = "processing"
-        job.started_at = datetime.utcnow()
+        job.task_id = self.request.id
+        if not job.started_at:
+            job.started_at = datetime.utcnow()
         db.commit()
 
-        # Create temp directory
-        temp_dir = os.path.join(settings.TEMP_DIR, f"job_{job_id}_{uuid.uuid4()}")
-        os.makedirs(temp_dir, exist_ok=True)
+        logger.info(f"Dispatching analysis of {len(asset_ids)} assets")
 
-        # Download assets
-        s3_client = get_s3_client()
-        assets = db.query(Asset).filter(Asset.project_id == project_id).all()
+        # Analysis spreads by asset, rendering follows the project's cached assets.
+        # The prompt is parsed on the light queue alongside the analyses (a
+        # no-op if it was pre-parsed), and the chord joins both before selection.
+        priority = PRIORITY_PREVIEW if preview else PRIORITY_FINAL
+        stages = [
+            analyze_asset.s(project_id, job_id, asset_id, len(asset_ids)).set(
+                queue=choose_queue(asset_shard(storage_key), settings.ANALYSIS_QUEUE),
+                priority=priority
+            )
+            for asset_id, storage_key in asset_rows
+        ]
+        stages.append(parse_project_prompt.si(project_id).set(priority=priority))
+        workflow = chord(
+            group(stages),
+            select_edit_plan.s(project_id, job_id, priority=priority).set(priority=priority)
+        )
+        workflow.link_error(edit_job_failed.s(project_id, job_id))
+        result = workflow.apply_async()
 
-        if not assets:
-            raise Exception("Project has no assets")
+        job.result = {**(job.result or {}), "workflow_id": result.id}
+        db.commit()
+
+        return {"status": "dispatched", "workflow_id": result.id}
 
-        logger.info(f"Processing {len(assets)} assets")
+    except JobCancelled:
+        _stop_cancelled(job_id)
 
-        clips_info = []  # List of (file_path, start, end)
-        all_tags = set()
+    except Retry:
+        raise
 
-        for asset in assets:
-            local_path = os.path.join(temp_dir, f"asset_{asset.id}_{asset.original_filename}")
-            download_asset(s3_client, asset.storage_key, local_path)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        _mark_failed(db, project_id, job_id, str(e))
+        raise
 
-            if asset.type == "video":
-                # Detect scenes
-                scenes_data = detect_scenes(local_path)
-                logger.info(f"Detected {len(scenes_data)} scenes in video")
+    finally:
+        db.close()
 
-                # Tag video
-                tags = tag_video(local_path)
-                all_tags.update(tags)
+        if lease:
+            lease.release()
 
-                # Store clips
-                for start, end in scenes_data:
-                    if start < end:  # Valid scene
-                        clips_info.append((local_path, start, end))
 
-            elif asset.type == "image":
-                # Tag image
-                tags = tag_image(local_path)
-                all_tags.update(tags)
+@celery_app.task(bind=True, name='analyze_asset', acks_late=True, reject_on_worker_lost=True)
+def analyze_asset(self, project_id: int, job_id: int, asset_id: int, asset_count: int, stream: bool = True) -> dict:
+    """
+    Download and analyze a single asset.
 
-                # Use full image as a 3-second clip
-                clips_info.append((local_path, 0, 3.0))
+    The result is stored on ``Asset.analysis_metadata`` keyed by storage key,
+    so a redelivered task (or a later job on the same asset) skips the work.
+    A failed analysis is retried (from a local download) and never stored.
 
-        logger.info(f"Found {len(clips_info)} clips and tags: {all_tags}")
+    Args:
+        stream: Allow decoding the video straight from object storage
 
-        # Parse prompt
-        parsed_prompt = parse_prompt_with_ollama(project.prompt)
-        logger.info(f"Parsed prompt: {parsed_prompt}")
+    Returns:
+        Dict with asset_id, type, scenes [(start, end), ...] and tags
+    """
+    db = SessionLocal()
+    local_path = None
+    cache_owner = f"job_{job_id}_asset_{asset_id}"
+    monitor = None
+    memory_estimate = 0
+    lease = None
+    cancelled = CancellationToken(job_id)
 
-        # Select shots
-        scenes_objs = []
-        for file_path, start, end in clips_info:
-            scene = Scene(
-                start=start,
-                end=end,
-                tags=list(all_tags),
-                score=5.0  # Placeholder aesthetic score
+    try:
+        cancelled.check()
+        _check_deliveries(self, project_id, job_id)
+
+        # One analysis per asset at a time; a duplicate waits, then reuses the result
+        lease = Lease(f"asset:{asset_id}:analysis")
+        if not lease.acquire():
+            logger.info(f"Asset {asset_id} is being analyzed elsewhere, checking back later")
+            raise self.retry(
+                countdown=lease.remaining(),
+                max_retries=self.request.retries + 1,
+                queue=settings.ANALYSIS_QUEUE
             )
-            scenes_objs.append(scene)
 
-        selected_clips = select_shots(
-            scenes_objs,
-            target_duration=parsed_prompt.get('duration'),
-            include_tags=parsed_prompt.get('include_tags', []),
-            exclude_tags=parsed_prompt.get('exclude_tags', [])
+        asset = db.query(Asset).filter(Asset.id == asset_id).first()
+        if not asset:
+            raise Exception(f"Asset {asset_id} not found")
+
+        job = db.query(Job).filter(Job.id == job_id).first()
+        progress = ProgressReporter(job_id, SessionLocal, started_at=job.started_at if job else None)
+
+        cached = asset.analysis_metadata
+        if cached and cached.get("storage_key") == asset.storage_key:
+            logger.info(f"Reusing analysis of asset {asset_id}")
+            progress.advance("download", asset_count)
+            progress.advance("analysis", asset_count)
+            return {"asset_id": asset_id, **cached}
+
+        asset_type = Asset.AssetType(asset.type).value
+        s3_client = get_s3_client()
+
+        # Hold the analysis back until this host has memory for it
+        memory_estimate = memory.estimate_analysis(*_asset_dimensions(db, s3_client, asset))
+        if not memory.reserve(
+            self.request.id, memory.calibrated("analysis", memory_estimate), celery_app.conf.task_time_limit
+        ):
+            logger.info(f"Holding back analysis of asset {asset_id} until memory frees up")
+            raise self.retry(
+                countdown=settings.MEMORY_RETRY_SECONDS,
+                max_retries=self.request.retries + 1,
+                queue=settings.ANALYSIS_QUEUE
+            )
+        monitor = memory.PeakRSSMonitor()
+        monitor.start()
+
+        # Videos are decoded straight from S3 so analysis overlaps the transfer.
+        # Local disk is used for images, and by the retry of a failed stream.
+        source = None
+        if asset_type == "video" and settings.STREAMING_ANALYSIS and stream:
+            source = presigned_get_url(s3_client, asset.storage_key)
+            logger.info(f"Analyzing asset {asset_id} from object storage stream")
+
+        if source is None:
+            work_dir = os.path.join(settings.JOB_WORK_DIR, f"job_{job_id}")
+            os.makedirs(work_dir, exist_ok=True)
+            local_path = os.path.join(work_dir, f"asset_{asset.id}_{asset.original_filename}")
+
+            download_progress = progress.unit_callback("download", asset_count)
+            if settings.ASSET_CACHE_ENABLED:
+                get_asset_cache().fetch(
+                    s3_client, asset.storage_key, local_path, owner=cache_owner, progress=download_progress
+                )
+            else:
+                download_asset(
+                    s3_client, asset.storage_key, local_path,
+                    progress=download_progress, total_bytes=asset.file_size
+                )
+            source = local_path
+        progress.advance("download", asset_count)
+
+        if asset_type == "video":
+            # Objects are tagged on the frames scene detection decodes, so the
+            # video is read once
+            analysis_progress = progress.unit_callback("analysis", asset_count)
+
+            def tagging_progress(fraction: float):
+                analysis_progress(fraction)
+                # A long pass over the video stays cancellable
+                cancelled.check()
+
+            tagger = FrameTagger(progress=tagging_progress)
+            scenes_data = detect_scenes(source, on_frame=tagger)
+            tags = tagger.tags
+            logger.info(f"Detected {len(scenes_data)} scenes and {len(tags)} object types in video")
+
+        else:
+            # Use full image as a 3-second clip
+            scenes_data = [(0, 3.0)]
+            tags = tag_image(source)
+
+        result = {
+            "storage_key": asset.storage_key,
+            "type": asset_type,
+            "scenes": [[start, end] for start, end in scenes_data if end > start],
+            "tags": list(tags)
+        }
+        if result["scenes"]:
+            asset.analysis_metadata = result
+            db.commit()
+        else:
+            # Not stored, so the asset is analyzed again by the next job
+            logger.warning(f"Asset {asset_id} has no usable scenes")
+        progress.advance("analysis", asset_count)
+
+        # A streamed asset never reached this host's cache
+        if settings.ASSET_CACHE_ENABLED and local_path:
+            advertise(asset_shard(asset.storage_key), self.request.hostname)
+
+        return {"asset_id": asset_id, **result}
+
+    except JobCancelled:
+        _stop_cancelled(job_id)
+
+    except (Retry, Ignore, SoftTimeLimitExceeded):
+        raise
+
+    except Exception as e:
+        # Streams can drop mid-read, so the retry works from a local copy
+        logger.warning(f"Analysis of asset {asset_id} failed, retrying: {str(e)}")
+        raise self.retry(
+            exc=e,
+            countdown=settings.ANALYSIS_RETRY_SECONDS,
+            kwargs={**self.request.kwargs, "stream": False},
+            queue=settings.ANALYSIS_QUEUE
+        )
+
+    finally:
+        db.close()
+
+        if lease:
+            lease.release()
+        if monitor:
+            memory.record_peak("analysis", memory_estimate, monitor.stop())
+        memory.release(self.request.id)
+
+        # Only the render worker needs local copies, and only of selected assets
+        if local_path and os.path.exists(local_path):
+            os.remove(local_path)
+        if settings.ASSET_CACHE_ENABLED:
+            get_asset_cache().release(cache_owner)
+
+
+@celery_app.task(bind=True, name='select_edit_plan')
+def select_edit_plan(
+    self, analysis_results: list, project_id: int, job_id: int, priority: int = PRIORITY_FINAL
+) -> dict:
+    """
+    Chord callback: select shots from all analysis results and queue the render.
+
+    The prompt was parsed concurrently with the analyses; it is only parsed
+    here if that stage is missing.
+
+    Parsing and selection are skipped when their inputs match the project's
+    previous edit (see workers.stages).
+
+    Args:
+        priority: Priority of the render task
+
+    Returns:
+        Dict with parsed_prompt, clips [(asset_id, start, end), ...],
+        asset_hashes, edl and edl_hash
+    """
+    db = SessionLocal()
+
+    try:
+        CancellationToken(job_id).check()
+
+        checkpoint = JobCheckpoint(get_s3_client(), project_id, job_id, local=False)
+        plan = checkpoint.get("selection")
+        if not plan:
+            plan = _edit_plan(db, analysis_results, project_id)
+            checkpoint.save("selection", plan)
+
+        job = db.query(Job).filter(Job.id == job_id).first()
+        ProgressReporter(job_id, SessionLocal, started_at=job.started_at if job else None).complete("selection")
+
+        # The worker is picked now rather than at fan-out, when its cache
+        # and load may have changed or it may be gone
+        render_edit.apply_async(
+            (plan, project_id, job_id),
+            queue=choose_queue(project_shard(project_id), settings.RENDER_QUEUE),
+            priority=priority,
+            link_error=edit_job_failed.s(project_id, job_id)
         )
 
-        if not selected_clips:
-            raise Exception("No clips selected after filtering")
+        return plan
+
+    except JobCancelled:
+        _stop_cancelled(job_id)
+
+    finally:
+        db.close()
+
+
+def _edit_plan(db: Session, analysis_results: list, project_id: int) -> dict:
+    """Parse the prompt, select clips and build the EDL for select_edit_plan"""
+    # The parse stage of the chord contributes no result
+    analysis_results = [r for r in analysis_results if r is not None]
+
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise Exception(f"Project {project_id} not found")
+
+    # Usually pre-parsed when the prompt was saved (see parse_project_prompt)
+    parsed_prompt = _parsed_prompt(db, project)
+    logger.info(f"Parsed prompt: {parsed_prompt}")
+
+    # Selection depends only on the analysis results and the selection
+    # fields of the prompt; effect changes (filter, music, ...) reuse it
+    selection_hash = input_hash(
+        sorted(
+            [r["asset_id"], r["storage_key"], r["scenes"], sorted(r["tags"])]
+            for r in analysis_results
+        ),
+        parsed_prompt.get('duration'),
+        parsed_prompt.get('include_tags', []),
+        parsed_prompt.get('exclude_tags', []),
+        SELECTOR_VERSION
+    )
+    selection = load_stage(db, project_id, "selection", selection_hash)
+    if selection is None:
+        selection = _select_clips(db, analysis_results, parsed_prompt)
+        save_stage(db, project_id, "selection", selection_hash, selection)
+
+    edl = build_edl(
+        selection["clips"], parsed_prompt,
+        {int(asset_id): h for asset_id, h in selection["asset_hashes"].items()}
+    )
+    return {
+        "parsed_prompt": parsed_prompt,
+        "clips": selection["clips"],
+        "asset_hashes": selection["asset_hashes"],
+        "edl": edl,
+        "edl_hash": edl_hash(edl)
+    }
+
+
+def _parsed_prompt(db: Session, project: Project) -> dict:
+    """Parse a project's prompt, unless it is unchanged since it was last parsed"""
+    # A new model or parser version invalidates earlier parses
+    parse_hash = input_hash(project.prompt, settings.OLLAMA_MODEL, PARSER_VERSION)
+    parsed_prompt = load_stage(db, project.id, "parse", parse_hash)
+    if parsed_prompt is None:
+        parsed_prompt = parse_prompt_with_llm(project.prompt)
+        if parsed_prompt is None:
+            # LLM unavailable: use the rules this time, but keep the stage
+            # unset so the next edit asks the LLM again
+            return parse_prompt_rule_based(project.prompt)
+        save_stage(db, project.id, "parse", parse_hash, parsed_prompt)
+    return parsed_prompt
+
+
+@celery_app.task(name='parse_project_prompt')
+def parse_project_prompt(project_id: int):
+    """
+    Parse a project's prompt as soon as it is saved.
+
+    Runs on the light queue while the user is still uploading, and again in
+    parallel with each edit job's analyses, so selection never waits on the LLM.
+
+    Args:
+        project_id: Project ID
+    """
+    db = SessionLocal()
 
-        # Build clips_info for selected shots
-        selected_clips_info = []
-        for start, end in selected_clips:
-            for file_path, clip_start, clip_end in clips_info:
-                if abs(clip_start - start) < 0.1 and abs(clip_end - end) < 0.1:
-                    selected_clips_info.append((file_path, start, end))
-                    break
+    try:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project or not project.prompt:
+            return
+        _parsed_prompt(db, project)
 
-        logger.info(f"Selected {len(selected_clips_info)} clips for rendering")
+    except Exception as e:
+        # Not fatal: the edit job parses inline if the stage is missing
+        logger.warning(f"Pre-parsing prompt of project {project_id} failed: {str(e)}")
+
+    finally:
+        db.close()
+
+
+def _select_clips(db: Session, analysis_results: list, parsed_prompt: dict) -> dict:
+    """
+    Select shots from the analysis results.
+
+    Returns:
+        Dict with clips [(asset_id, start, end), ...] and the content hash of
+        each selected asset, keyed by asset ID as a string
+    """
+    clips_info = []  # List of (asset_id, start, end)
+    all_tags = set()
+    for result in analysis_results:
+        all_tags.update(result["tags"])
+        for start, end in result["scenes"]:
+            if start < end:  # Valid scene
+                clips_info.append((result["asset_id"], start, end))
+
+    logger.info(f"Found {len(clips_info)} clips and tags: {all_tags}")
+
+    # Select shots; each scene carries its asset, since scenes of different
+    # assets can share boundaries (every image is 0-3s)
+    scenes_objs = []
+    for asset_id, start, end in clips_info:
+        scene = Scene(
+            start=start,
+            end=end,
+            tags=list(all_tags),
+            score=5.0,  # Placeholder aesthetic score
+            asset_id=asset_id
+        )
+        scenes_objs.append(scene)
+
+    selected_clips_info = select_shots(
+        scenes_objs,
+        target_duration=parsed_prompt.get('duration'),
+        include_tags=parsed_prompt.get('include_tags', []),
+        exclude_tags=parsed_prompt.get('exclude_tags', [])
+    )
+
+    if not selected_clips_info:
+        raise Exception("No clips selected after filtering")
+
+    logger.info(f"Selected {len(selected_clips_info)} clips for rendering")
+
+    # Content hashes (ETags) identify identical footage across projects
+    s3_client = get_s3_client()
+    asset_hashes = {}
+    for asset in db.query(Asset).filter(Asset.id.in_({a for a, _, _ in selected_clips_info})).all():
+        head = s3_client.head_object(Bucket=settings.S3_BUCKET, Key=asset.storage_key)
+        asset_hashes[str(asset.id)] = head['ETag'].strip('"')
+
+    return {"clips": selected_clips_info, "asset_hashes": asset_hashes}
+
+
+@celery_app.task(
+    bind=True,
+    name='render_edit',
+    acks_late=True,
+    reject_on_worker_lost=True,
+    max_retries=2
+)
+def render_edit(self, plan: dict, project_id: int, job_id: int):
+    """
+    Render the selected shots and publish the output.
+
+    Args:
+        plan: Output of select_edit_plan
+        project_id: ID of the project
+        job_id: ID of the job
+    """
+    db = SessionLocal()
+    checkpoint = None
+    retrying = False
+    cache_owner = f"job_{job_id}_render"
+    monitor = None
+    memory_estimate = 0
+    uploader = None
+    lease = None
+    cancelled = CancellationToken(job_id)
+
+    try:
+        cancelled.check()
+        _check_deliveries(self, project_id, job_id)
+
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception(f"Job {job_id} not found")
+
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise Exception(f"Project {project_id} not found")
+
+        # A redelivered copy must never render what another worker is rendering
+        lease = Lease(f"job:{job_id}:render")
+        if not lease.acquire():
+            logger.info(f"Job {job_id} is being rendered elsewhere, checking back later")
+            raise self.retry(
+                countdown=lease.remaining(),
+                max_retries=self.request.retries + 1,
+                queue=settings.RENDER_QUEUE
+            )
+
+        db.refresh(job)
+        if job.status == "completed":
+            logger.info(f"Job {job_id} was already rendered, skipping duplicate delivery")
+            return {"status": "success", "output_key": project.output_video_key}
+
+        s3_client = get_s3_client()
+
+        # An identical edit was rendered before: reuse its output
+        cached_key = _cached_render(db, s3_client, plan.get("edl_hash"))
+        if cached_key:
+            _complete_job(db, project, job, cached_key, {
+                "output_key": cached_key,
+                "parsed_prompt": plan["parsed_prompt"],
+                "clips_count": len(plan["clips"]),
+                "edl_hash": plan["edl_hash"],
+                "cached": True
+            })
+            JobCheckpoint(s3_client, project_id, job_id, local=False).clear()
+            logger.info(f"Job {job_id} served from render cache ({plan['edl_hash']})")
+            return {"status": "success", "output_key": cached_key, "cached": True}
+
+        # Hold the render back until this host has memory for it
+        parsed_prompt = plan["parsed_prompt"]
+        assets = {asset.id: asset for asset in db.query(Asset).filter(
+            Asset.id.in_({asset_id for asset_id, _, _ in plan["clips"]})
+        ).all()}
+        memory_estimate = memory.estimate_render(
+            [_asset_dimensions(db, s3_client, assets[asset_id]) for asset_id, _, _ in plan["clips"]],
+            transitions=parsed_prompt.get('transition', 'none') != 'none',
+            filtered=parsed_prompt.get('filter', 'none') != 'none'
+        )
+        if not memory.reserve(
+            self.request.id, memory.calibrated("render", memory_estimate), celery_app.conf.task_time_limit
+        ):
+            logger.info(f"Holding back render of job {job_id} until memory frees up")
+            # Waiting for memory must not use up the task's retries
+            raise self.retry(
+                countdown=settings.MEMORY_RETRY_SECONDS,
+                max_retries=self.request.retries + 1,
+                queue=settings.RENDER_QUEUE
+            )
+        monitor = memory.PeakRSSMonitor()
+        monitor.start()
+
+        # Durable work area; a retried attempt picks up where this one stopped
+        checkpoint = JobCheckpoint(s3_client, project_id, job_id)
+        temp_dir = checkpoint.work_dir
+        # State left by an earlier attempt means this one is a retry or redelivery
+        resumed = self.request.retries > 0 or checkpoint.get("download") is not None
+        progress = ProgressReporter(job_id, SessionLocal, started_at=job.started_at)
+
+        # Download only the assets that made it into the edit, in parallel
+        downloads = checkpoint.get("download", {})
+        pending = []
+        for asset in assets.values():
+            asset_key = str(asset.id)
+            local_path = checkpoint.local_path(f"asset_{asset.id}_{asset.original_filename}")
+
+            if not (asset_key in downloads and os.path.exists(local_path)):
+                pending.append((asset_key, asset.storage_key, local_path))
+
+        items = [(storage_key, local_path) for _, storage_key, local_path in pending]
+        if settings.ASSET_CACHE_ENABLED:
+            transfer_metrics = {"asset_cache": get_asset_cache().fetch_many(s3_client, items, owner=cache_owner)}
+        else:
+            transfer_metrics = {"download": download_many(s3_client, items)}
+        for asset_key, _, local_path in pending:
+            downloads[asset_key] = local_path
+        if pending:
+            checkpoint.save("download", downloads)
+
+        selected_clips_info = [
+            (downloads[str(asset_id)], start, end) for asset_id, start, end in plan["clips"]
+        ]
+
+        # Without overlays or music the timeline segments are joined into the
+        # output by stream copy. Otherwise the joined timeline is encoded once
+        # more, so segments would double the work; only a retried attempt
+        # uses them, to skip what the failed one already encoded.
+        segment_dir = None
+        clip_keys = None
+        final_pass = needs_final_pass(parsed_prompt.get('text_overlays', []), parsed_prompt.get('music_mood', 'none'))
+        if resumed or not final_pass:
+            # Segments named by content live per project, so the next edit of this
+            # project re-encodes only the parts of the timeline that changed
+            segment_dir = checkpoint.segment_dir
+            asset_hashes = plan.get("asset_hashes")
+            if asset_hashes:
+                segment_dir = os.path.join(settings.SEGMENT_CACHE_DIR, f"project_{project_id}")
+                clip_keys = [
+                    f"{asset_hashes[str(asset_id)]}@{start:.3f}-{end:.3f}"
+                    for asset_id, start, end in plan["clips"]
+                ]
 
         # Render video
         output_filename = f"project_{project_id}_{uuid.uuid4()}.mp4"
         output_path = os.path.join(temp_dir, output_filename)
 
+        # Publish HLS segments while rendering so playback can start early
+        stream_dir = None
+        if settings.STREAMING_OUTPUT:
+            stream_dir = os.path.join(temp_dir, "stream")
+            # A previous attempt's playlist is incomplete; start it over
+            shutil.rmtree(stream_dir, ignore_errors=True)
+            uploader = HLSUploader(
+                s3_client,
+                stream_dir,
+                key_prefix=f"projects/{project_id}/output/stream_{job_id}",
+                on_first_segment=lambda key: _publish_stream_key(job_id, key)
+            )
+            uploader.start()
+
         success = render_video(
             clips_info=selected_clips_info,
             output_path=output_path,
@@ -204,62 +692,225 @@ def process_edit_job(self, project_id: int, job_id: int):
             transition_type=parsed_prompt.get('transition', 'none'),
             music_mood=parsed_prompt.get('music_mood', 'none'),
             text_overlays=parsed_prompt.get('text_overlays', []),
-            duration=parsed_prompt.get('duration')
+            duration=parsed_prompt.get('duration'),
+            stream_dir=stream_dir,
+            segment_dir=segment_dir,
+            on_segment=checkpoint.mark_segment,
+            progress=progress.callback("render"),
+            clip_keys=clip_keys,
+            cancelled=cancelled,
+            clip_types=[Asset.AssetType(assets[asset_id].type).value for asset_id, _, _ in plan["clips"]]
         )
 
+        if uploader:
+            uploader.finish()
+
         if not success:
             raise Exception("Video rendering failed")
+        cancelled.check()
+
+        if clip_keys:
+            _prune_segments(segment_dir, keep=checkpoint.manifest["segments"])
+        try:
+            evict_segment_cache()
+        except Exception as e:
+            logger.warning(f"Segment cache eviction failed: {str(e)}")
 
         # Upload to S3
         output_s3_key = f"projects/{project_id}/output/{output_filename}"
-        upload_to_s3(s3_client, output_path, output_s3_key)
+        transfer_metrics["upload"] = upload_to_s3(
+            s3_client, output_path, output_s3_key, content_type="video/mp4"
+        )
+        progress.complete("upload")
 
-        # Update project
-        project.status = "completed"
-        project.output_video_key = output_s3_key
+        if plan.get("edl_hash"):
+            # The EDL is kept so a cache hit can be traced to what was rendered
+            db.merge(RenderOutput(edl_hash=plan["edl_hash"], edl=plan.get("edl"), output_key=output_s3_key))
+            # Kept even if the job turns out cancelled; the output is valid
+            db.commit()
 
-        # Update job
-        job.status = "completed"
-        job.result = {
+        _complete_job(db, project, job, output_s3_key, {
             "output_key": output_s3_key,
             "parsed_prompt": parsed_prompt,
-            "clips_count": len(selected_clips_info)
-        }
-        job.completed_at = datetime.utcnow()
-
-        db.commit()
+            "clips_count": len(selected_clips_info),
+            "edl_hash": plan.get("edl_hash"),
+            "stream_key": uploader.playlist_key if uploader and uploader.uploaded else None,
+            "transfer": transfer_metrics,
+            "memory": {"estimated_bytes": memory_estimate, "peak_bytes": monitor.peak}
+        })
         logger.info(f"Job {job_id} completed successfully")
 
+        if settings.ASSET_CACHE_ENABLED:
+            advertise(project_shard(project_id), self.request.hostname)
+
         return {"status": "success", "output_key": output_s3_key}
 
-    except Exception as e:
-        logger.error(f"Job {job_id} failed: {str(e)}")
+    except (JobCancelled, RenderCancelled):
+        _stop_cancelled(job_id)
+
+    except SoftTimeLimitExceeded as e:
+        # Out of time for this attempt: keep the checkpoint and continue in a new one.
+        # Resumes are counted in the checkpoint since memory hold-backs also retry.
+        resumes = checkpoint.get("resumes", 0) if checkpoint else self.max_retries
+        if resumes < self.max_retries:
+            logger.warning(f"Job {job_id} hit the soft time limit, resuming from checkpoint")
+            checkpoint.save("resumes", resumes + 1)
+            retrying = True
+            raise self.retry(exc=e, countdown=0, max_retries=self.request.retries + 1)
+        raise
 
-        try:
-            job = db.query(Job).filter(Job.id == job_id).first()
-            if job:
-                job.status = "failed"
-                job.error = str(e)
-                job.completed_at = datetime.utcnow()
+    finally:
+        db.close()
 
-            project = db.query(Project).filter(Project.id == project_id).first()
-            if project:
-                project.status = "failed"
-                project.error_message = str(e)
+        # On any failure, so a retry on this worker never races a leftover uploader
+        if uploader:
+            uploader.stop()
+        if lease:
+            lease.release()
+        if monitor:
+            memory.record_peak("render", memory_estimate, monitor.stop())
+        memory.release(self.request.id)
 
-            db.commit()
-        except Exception as db_e:
-            logger.error(f"Failed to update job status: {str(db_e)}")
+        # Keep the work area only while another attempt may still use it
+        if checkpoint and not retrying:
+            checkpoint.clear()
+        if settings.ASSET_CACHE_ENABLED:
+            get_asset_cache().release(cache_owner)
 
-        raise
 
+@celery_app.task(name='edit_job_failed')
+def edit_job_failed(request, exc, traceback, project_id: int, job_id: int):
+    """Error callback for the edit workflow: record the failure and drop checkpoints"""
+    logger.error(f"Job {job_id} failed: {str(exc)}")
+
+    db = SessionLocal()
+    try:
+        message = "Job exceeded its time limit" if isinstance(exc, SoftTimeLimitExceeded) else str(exc)
+        _mark_failed(db, project_id, job_id, message)
     finally:
         db.close()
 
-        # Cleanup temp directory
-        if temp_dir and os.path.exists(temp_dir):
+    JobCheckpoint(get_s3_client(), project_id, job_id, local=False).clear()
+
+
+def _check_deliveries(task, project_id: int, job_id: int):
+    """
+    Fail a job whose task keeps being redelivered.
+
+    An attempt that gets its worker killed (e.g. out of memory) is requeued
+    by acks_late; without a limit it would go on killing workers forever.
+    """
+    deliveries = count_delivery(task.request.id, task.request.retries)
+    if deliveries <= settings.MAX_TASK_DELIVERIES:
+        return
+
+    message = f"{task.name} was interrupted {deliveries - 1} times, the worker may be running out of memory"
+    edit_job_failed(task.request, Exception(message), None, project_id, job_id)
+    # Stop the job's other tasks at their next cancellation point
+    request_cancel(job_id)
+    raise Ignore()
+
+
+def _asset_dimensions(db: Session, s3_client, asset: Asset):
+    """Frame size of an asset, probed from object storage once and stored"""
+    if not (asset.width and asset.height):
+        dimensions = memory.probe_dimensions(presigned_get_url(s3_client, asset.storage_key))
+        if not dimensions:
+            return memory.UNKNOWN_DIMENSIONS
+        asset.width, asset.height = dimensions
+        db.commit()
+    return asset.width, asset.height
+
+
+def _prune_segments(segment_dir: str, keep: list):
+    """Drop project segments the latest render no longer uses"""
+    for name in os.listdir(segment_dir):
+        # Partial files belong to a render still in progress
+        if name.endswith(".mp4") and not name.endswith(".part.mp4") and name not in keep:
             try:
-                shutil.rmtree(temp_dir)
-                logger.info(f"Cleaned up temp directory {temp_dir}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp directory: {str(e)}")
+                os.remove(os.path.join(segment_dir, name))
+            except OSError as e:
+                logger.warning(f"Failed to remove stale segment {name}: {str(e)}")
+
+
+def _cached_render(db: Session, s3_client, plan_hash: str):
+    """Look up a previous render of the same EDL whose output still exists"""
+    if not plan_hash:
+        return None
+
+    entry = db.query(RenderOutput).filter(RenderOutput.edl_hash == plan_hash).first()
+    if not entry:
+        return None
+
+    try:
+        s3_client.head_object(Bucket=settings.S3_BUCKET, Key=entry.output_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+            logger.warning(f"Render cache check failed, rendering again: {str(e)}")
+            return None
+        # Output was removed; forget it and render again
+        db.delete(entry)
+        db.commit()
+        return None
+    except Exception as e:
+        # Throttling, timeouts and the like say nothing about the output
+        logger.warning(f"Render cache check failed, rendering again: {str(e)}")
+        return None
+
+    return entry.output_key
+
+
+def _complete_job(db: Session, project: Project, job: Job, output_key: str, result: dict):
+    """
+    Point the project at its output and mark the job completed.
+
+    Raises:
+        JobCancelled: The job was cancelled meanwhile (e.g. during the upload);
+            nothing is changed then
+    """
+    # Conditional, so a cancel that landed after the last cancellation point wins
+    completed = db.query(Job).filter((Job.id == job.id) & (Job.status != "cancelled")).update({
+        Job.status: "completed",
+        Job.progress: 100.0,
+        Job.result: result,
+        Job.completed_at: datetime.utcnow()
+    }, synchronize_session=False)
+    if not completed:
+        db.rollback()
+        raise JobCancelled(f"Job {job.id} was cancelled")
+
+    project.status = "completed"
+    project.output_video_key = output_key
+
+    db.commit()
+    release_slot(job.id)
+
+
+def _stop_cancelled(job_id: int):
+    """Abort a task of a cancelled job; the finally blocks clean up its files"""
+    logger.info(f"Job {job_id} was cancelled, stopping")
+    kill_subprocesses()
+    raise Ignore()
+
+
+def _mark_failed(db: Session, project_id: int, job_id: int, error: str):
+    """Record a terminal job failure"""
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job and job.status == "cancelled":
+            return
+        if job:
+            job.status = "failed"
+            job.error = error
+            job.completed_at = datetime.utcnow()
+
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if project:
+            project.status = "failed"
+            project.error_message = error
+
+        db.commit()
+    except Exception as db_e:
+        logger.error(f"Failed to update job status: {str(db_e)}")
+
+    release_slot(job_id)
@@ -0,0 +1,164 @@
+"""S3 transfer layer: tuned multipart transfers and bounded parallel downloads"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from boto3.s3.transfer import TransferConfig
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def transfer_config() -> TransferConfig:
+    """
+    Build the TransferConfig used for all asset and output transfers.
+
+    Files above the threshold are fetched as parallel ranged GETs (and sent as
+    multipart uploads) of S3_MULTIPART_CHUNKSIZE bytes each.
+    """
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.S3_MAX_CONCURRENCY,
+        use_threads=True
+    )
+
+
+def _throughput(label: str, num_bytes: int, started: float) -> Dict:
+    """Log and return transfer throughput metrics"""
+    seconds = max(time.monotonic() - started, 1e-6)
+    metrics = {
+        "bytes": num_bytes,
+        "seconds": round(seconds, 3),
+        "mb_per_second": round(num_bytes / MB / seconds, 2)
+    }
+    logger.info(
+        f"{label}: {num_bytes / MB:.1f} MB in {metrics['seconds']}s "
+        f"({metrics['mb_per_second']} MB/s)"
+    )
+    return metrics
+
+
+def download_asset(
+    s3_client,
+    storage_key: str,
+    local_path: str,
+    progress: Optional[Callable[[float], None]] = None,
+    total_bytes: int = None
+) -> Dict:
+    """
+    Download asset from S3, optionally reporting the fraction of bytes received.
+
+    Returns:
+        Throughput metrics for the transfer
+    """
+    try:
+        if not total_bytes:
+            head = s3_client.head_object(Bucket=settings.S3_BUCKET, Key=storage_key)
+            total_bytes = head['ContentLength']
+
+        # boto3 invokes the callback from its worker threads
+        received = [0]
+        lock = threading.Lock()
+
+        def callback(chunk_bytes):
+            with lock:
+                received[0] += chunk_bytes
+                done = received[0]
+            if progress:
+                progress(done / total_bytes if total_bytes else 1.0)
+
+        started = time.monotonic()
+        s3_client.download_file(
+            Bucket=settings.S3_BUCKET,
+            Key=storage_key,
+            Filename=local_path,
+            Callback=callback,
+            Config=transfer_config()
+        )
+        return _throughput(f"Downloaded {storage_key}", received[0], started)
+    except Exception as e:
+        raise Exception(f"Failed to download asset: {str(e)}")
+
+
+def download_many(
+    s3_client,
+    items: List[Tuple[str, str]],
+    progress: Optional[Callable[[float], None]] = None
+) -> Dict:
+    """
+    Download several assets concurrently with a bounded thread pool.
+
+    Args:
+        s3_client: Shared boto3 S3 client (thread-safe)
+        items: List of (storage_key, local_path) pairs
+        progress: Called with the fraction of files completed
+
+    Returns:
+        Aggregate throughput metrics
+    """
+    if not items:
+        return {"bytes": 0, "seconds": 0.0, "mb_per_second": 0.0}
+
+    started = time.monotonic()
+    completed = [0]
+    lock = threading.Lock()
+
+    def fetch(item):
+        storage_key, local_path = item
+        metrics = download_asset(s3_client, storage_key, local_path)
+        with lock:
+            completed[0] += 1
+            done = completed[0]
+        if progress:
+            progress(done / len(items))
+        return metrics
+
+    workers = min(settings.S3_DOWNLOAD_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-download") as pool:
+        results = list(pool.map(fetch, items))
+
+    return _throughput(
+        f"Downloaded {len(items)} assets with {workers} workers",
+        sum(r["bytes"] for r in results),
+        started
+    )
+
+
+def upload_to_s3(s3_client, file_path: str, key: str, content_type: str = None) -> Dict:
+    """
+    Upload file to S3 (multipart above the configured threshold).
+
+    Returns:
+        Throughput metrics for the transfer
+    """
+    try:
+        extra_args = {'ContentType': content_type} if content_type else None
+        started = time.monotonic()
+        s3_client.upload_file(
+            Filename=file_path,
+            Bucket=settings.S3_BUCKET,
+            Key=key,
+            ExtraArgs=extra_args,
+            Config=transfer_config()
+        )
+        return _throughput(f"Uploaded {file_path} to {key}", os.path.getsize(file_path), started)
+    except Exception as e:
+        raise Exception(f"Failed to upload to S3: {str(e)}")
+
+
+def presigned_get_url(s3_client, storage_key: str) -> str:
+    """
+    Presigned GET URL that ffmpeg/OpenCV can read from directly.
+
+    Signing happens locally; no request is sent to S3.
+    """
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': settings.S3_BUCKET, 'Key': storage_key},
+        ExpiresIn=settings.PRESIGNED_GET_EXPIRE_SECONDS
+    )
@@ -1,5 +1,10 @@
 import React, { useState, useEffect } from 'react';
-import { CheckCircle, AlertCircle, Loader } from 'lucide-react';
+import { CheckCircle, AlertCircle, Loader, XCircle } from 'lucide-react';
+
+const formatEta = (seconds) => {
+  if (seconds < 60) return `${Math.ceil(seconds)}s`;
+  return `${Math.ceil(seconds / 60)} min`;
+};
 
 const ProcessingStatus = ({ job, isPolling }) => {
   if (!job) return null;
@@ -10,6 +15,8 @@ const ProcessingStatus = ({ job, isPolling }) => {
         return <CheckCircle className="text-green-500" size={24} />;
       case 'failed':
         return <AlertCircle className="text-red-500" size={24} />;
+      case 'cancelled':
+        return <XCircle className="text-gray-500" size={24} />;
       case 'processing':
       case 'pending':
         return <Loader className="text-blue-500 animate-spin" size={24} />;
@@ -24,6 +31,8 @@ const ProcessingStatus = ({ job, isPolling }) => {
         return 'Completed';
       case 'failed':
         return 'Failed';
+      case 'cancelled':
+        return 'Cancelled';
       case 'processing':
         return 'Processing';
       case 'pending':
@@ -56,6 +65,9 @@ const ProcessingStatus = ({ job, isPolling }) => {
           {isPolling && job.status === 'processing' && (
             <p className="text-sm text-gray-600">Processing your video...</p>
           )}
+          {job.status === 'pending' && job.queue_position != null && (
+            <p className="text-sm text-gray-600">Queued · position {job.queue_position}</p>
+          )}
           {job.error && (
             <p className="text-sm text-red-600">{job.error}</p>
           )}
@@ -72,7 +84,12 @@ const ProcessingStatus = ({ job, isPolling }) => {
       )}
 
       {job.progress > 0 && (
-        <p className="text-sm text-gray-600 text-right">{Math.round(job.progress)}%</p>
+        <p className="text-sm text-gray-600 text-right">
+          {Math.round(job.progress)}%
+          {job.status === 'processing' && job.eta_seconds != null && (
+            <span> · about {formatEta(job.eta_seconds)} left</span>
+          )}
+        </p>
       )}
     </div>
   );
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { ArrowLeft, Play } from 'lucide-react';
+import { ArrowLeft, Play, XCircle } from 'lucide-react';
 import { projectsAPI, assetsAPI } from '../../services/api';
 import { useJobs } from '../../hooks/useJobs';
 import UploadZone from '../UploadZone/UploadZone';
@@ -15,14 +15,14 @@ const Editor = () => {
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
   const [prompt, setPrompt] = useState('');
-  const { job, isLoading: isJobLoading, startEdit, pollJobStatus } = useJobs(projectId);
+  const { job, isLoading: isJobLoading, startEdit, cancelJob, pollJobStatus } = useJobs(projectId);
 
   useEffect(() => {
     fetchProject();
   }, [projectId]);
 
   useEffect(() => {
-    if (job?.status === 'processing') {
+    if (['pending', 'processing'].includes(job?.status)) {
       const unsubscribe = pollJobStatus(job.id);
       return unsubscribe;
     }
@@ -63,6 +63,14 @@ const Editor = () => {
     }
   };
 
+  const handleCancelEdit = async () => {
+    try {
+      await cancelJob(job.id);
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to cancel editing');
+    }
+  };
+
   const handleDeleteAsset = async (assetId) => {
     if (window.confirm('Delete this asset?')) {
       try {
@@ -154,6 +162,9 @@ const Editor = () => {
             {job?.status === 'completed' && job.result?.output_key && (
               <VideoPlayer videoKey={job.result.output_key} />
             )}
+            {job?.status === 'processing' && job.result?.stream_key && (
+              <VideoPlayer streamKey={job.result.stream_key} />
+            )}
           </div>
 
           {/* Right Column: Prompt & Actions */}
@@ -183,8 +194,19 @@ const Editor = () => {
               />
             )}
 
+            {/* Cancel Button */}
+            {['pending', 'processing'].includes(job?.status) && (
+              <button
+                onClick={handleCancelEdit}
+                className="w-full flex items-center justify-center gap-2 bg-gray-200 text-gray-800 px-6 py-3 rounded-lg hover:bg-gray-300 transition font-bold"
+              >
+                <XCircle size={20} />
+                Cancel
+              </button>
+            )}
+
             {/* Start Editing Button */}
-            {(!job || ['draft', 'failed'].includes(job.status)) && assets.length > 0 && (
+            {(!job || ['draft', 'failed', 'cancelled'].includes(job.status)) && assets.length > 0 && (
               <button
                 onClick={handleStartEdit}
                 disabled={isJobLoading}
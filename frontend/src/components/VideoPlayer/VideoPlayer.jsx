@@ -2,11 +2,14 @@ import React from 'react';
 import ReactPlayer from 'react-player';
 import { Download } from 'lucide-react';
 
-const VideoPlayer = ({ videoKey }) => {
-  if (!videoKey) return null;
+const VideoPlayer = ({ videoKey, streamKey }) => {
+  if (!videoKey && !streamKey) return null;
 
   const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
   const videoUrl = `${API_BASE_URL}/videos/${videoKey}`;
+  // While the render is still running, play the HLS playlist as it grows
+  const isStreaming = !videoKey;
+  const playerUrl = isStreaming ? `${API_BASE_URL}/videos/${streamKey}` : videoUrl;
 
   const handleDownload = async () => {
     try {
@@ -27,11 +30,13 @@ const VideoPlayer = ({ videoKey }) => {
 
   return (
     <div className="bg-white rounded-lg shadow-lg p-6">
-      <h3 className="text-xl font-bold mb-4">Generated Video</h3>
+      <h3 className="text-xl font-bold mb-4">
+        {isStreaming ? 'Preview (still rendering)' : 'Generated Video'}
+      </h3>
 
       <div className="mb-6 bg-black rounded-lg overflow-hidden">
         <ReactPlayer
-          url={videoUrl}
+          url={playerUrl}
           controls
           width="100%"
           height="100%"
@@ -39,13 +44,15 @@ const VideoPlayer = ({ videoKey }) => {
         />
       </div>
 
-      <button
-        onClick={handleDownload}
-        className="flex items-center gap-2 bg-green-500 text-white px-6 py-2 rounded-lg hover:bg-green-600 transition w-full justify-center"
-      >
-        <Download size={20} />
-        Download Video
-      </button>
+      {!isStreaming && (
+        <button
+          onClick={handleDownload}
+          className="flex items-center gap-2 bg-green-500 text-white px-6 py-2 rounded-lg hover:bg-green-600 transition w-full justify-center"
+        >
+          <Download size={20} />
+          Download Video
+        </button>
+      )}
     </div>
   );
 };
@@ -30,7 +30,9 @@ export const useJobs = (projectId) => {
       setError(null);
       return response.data;
     } catch (err) {
-      const errorMsg = err.response?.data?.detail || 'Failed to start editing';
+      const retryAfter = err.response?.status === 429 && err.response.headers?.['retry-after'];
+      const errorMsg = (err.response?.data?.detail || 'Failed to start editing')
+        + (retryAfter ? ` (try again in ${retryAfter}s)` : '');
       setError(errorMsg);
       throw err;
     } finally {
@@ -38,13 +40,19 @@ export const useJobs = (projectId) => {
     }
   };
 
+  const cancelJob = async (jobId) => {
+    const response = await jobsAPI.cancel(jobId);
+    setJob(response.data);
+    return response.data;
+  };
+
   const pollJobStatus = (jobId, interval = 2000) => {
     const intervalId = setInterval(async () => {
       try {
         const response = await jobsAPI.getStatus(jobId);
         setJob(response.data);
 
-        if (response.data.status === 'completed' || response.data.status === 'failed') {
+        if (['completed', 'failed', 'cancelled'].includes(response.data.status)) {
           clearInterval(intervalId);
         }
       } catch (err) {
@@ -55,5 +63,5 @@ export const useJobs = (projectId) => {
     return () => clearInterval(intervalId);
   };
 
-  return { job, isLoading, error, getLatestJob, startEdit, pollJobStatus };
+  return { job, isLoading, error, getLatestJob, startEdit, cancelJob, pollJobStatus };
 };
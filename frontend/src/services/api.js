@@ -62,6 +62,7 @@ export const jobsAPI = {
   startEdit: (projectId) => api.post(`/api/jobs/project/${projectId}/start-edit`, {}),
   getStatus: (jobId) => api.get(`/api/jobs/${jobId}`),
   getLatest: (projectId) => api.get(`/api/jobs/project/${projectId}/latest`),
+  cancel: (jobId) => api.post(`/api/jobs/${jobId}/cancel`),
 };
 
 export default api;